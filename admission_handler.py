@@ -1,6 +1,8 @@
-from typing import Dict, Optional
+from typing import Dict, Mapping, Optional, Set, Tuple
 from dataclasses import dataclass
 from enum import Enum
+from types import MappingProxyType
+import re
 
 class AdmissionType(Enum):
     DOMESTIC = "domestic"
@@ -8,87 +10,136 @@ class AdmissionType(Enum):
     NRI = "nri"
     TRANSFER = "transfer"
 
-@dataclass
+@dataclass(frozen=True, slots=True)
 class AdmissionRequirements:
-    documents: list[str]
+    documents: Tuple[str, ...]
     eligibility: str
     contact_email: str
     procedure: str
-    deadlines: Dict[str, str]
+    deadlines: Mapping[str, str]
+
+# Keyword vocabularies, matched as substrings of the lowercased query
+_INTERNATIONAL_KWS = frozenset({"international", "foreign", "abroad", "overseas"})
+_NRI_KWS = frozenset({"nri", "non resident", "non-resident"})
+_TRANSFER_KWS = frozenset({"transfer", "change university", "credit transfer"})
+_DOMESTIC_KWS = frozenset({"domestic", "indian", "local", "srmjeee"})
+_DOC_KWS = frozenset({"document", "require", "submit"})
+_ELIGIBILITY_KWS = frozenset({"eligible", "eligibility", "qualify"})
+_PROCEDURE_KWS = frozenset({"procedure", "process", "how to", "steps"})
+_DEADLINE_KWS = frozenset({"deadline", "date", "when"})
+_CONTACT_KWS = frozenset({"contact", "email", "reach"})
+
+def _build_keyword_table() -> Dict[str, Tuple[str, object]]:
+    """Map every admission keyword to the (bucket, value) it signals."""
+    table = {}
+    for admission_type, words in (
+        (AdmissionType.INTERNATIONAL, _INTERNATIONAL_KWS),
+        (AdmissionType.NRI, _NRI_KWS),
+        (AdmissionType.TRANSFER, _TRANSFER_KWS),
+        (AdmissionType.DOMESTIC, _DOMESTIC_KWS),
+    ):
+        for word in words:
+            table[word] = ("type", admission_type)
+    for field, words in (
+        ("documents", _DOC_KWS),
+        ("eligibility", _ELIGIBILITY_KWS),
+        ("procedure", _PROCEDURE_KWS),
+        ("deadlines", _DEADLINE_KWS),
+        ("contact", _CONTACT_KWS),
+    ):
+        for word in words:
+            table[word] = ("field", field)
+    return table
+
+_KEYWORDS = _build_keyword_table()
+
+# Zero-width lookahead so overlapping keywords are all reported, like a multi-pattern automaton
+_KEYWORD_RE = re.compile(
+    "(?=(" + "|".join(re.escape(w) for w in sorted(_KEYWORDS, key=len, reverse=True)) + "))"
+)
+
+_TYPE_PRECEDENCE = (
+    AdmissionType.INTERNATIONAL,
+    AdmissionType.NRI,
+    AdmissionType.TRANSFER,
+    AdmissionType.DOMESTIC,
+)
+
+_REQUIREMENTS: Mapping[AdmissionType, AdmissionRequirements] = MappingProxyType({
+    AdmissionType.DOMESTIC: AdmissionRequirements(
+        documents=(
+            "10th Mark Sheet",
+            "12th Mark Sheet",
+            "SRMJEEE Score Card",
+            "Aadhar Card",
+            "Passport size photographs"
+        ),
+        eligibility="Minimum 60% in PCM for Engineering",
+        contact_email="admissions@srmist.edu.in",
+        procedure="Apply through SRMJEEE and counselling",
+        deadlines=MappingProxyType({
+            "SRMJEEE Registration": "April 30",
+            "Counselling": "June-July"
+        })
+    ),
+    AdmissionType.INTERNATIONAL: AdmissionRequirements(
+        documents=(
+            "High School Transcripts",
+            "Standardized Test Scores (SAT/ACT)",
+            "English Proficiency (IELTS/TOEFL)",
+            "Passport",
+            "Statement of Purpose"
+        ),
+        eligibility="Completed 12 years of education with good academic record",
+        contact_email="admissions.ir@srmist.edu.in",
+        procedure="Apply through International Admissions Portal",
+        deadlines=MappingProxyType({
+            "Fall Semester": "June 30",
+            "Spring Semester": "December 15"
+        })
+    ),
+    AdmissionType.NRI: AdmissionRequirements(
+        documents=(
+            "NRI Status Proof",
+            "Passport copies",
+            "Academic transcripts",
+            "Bank statements"
+        ),
+        eligibility="NRI/NRI Sponsored candidates",
+        contact_email="nri.admissions@srmist.edu.in",
+        procedure="Direct admission through NRI quota",
+        deadlines=MappingProxyType({
+            "Application": "May 31",
+            "Admission": "June 30"
+        })
+    ),
+    AdmissionType.TRANSFER: AdmissionRequirements(
+        documents=(
+            "Current University Transcripts",
+            "No Objection Certificate",
+            "Migration Certificate",
+            "Syllabus of completed courses"
+        ),
+        eligibility="Completed at least one year at recognized university",
+        contact_email="transfer.admissions@srmist.edu.in",
+        procedure="Apply with complete transcripts for credit transfer",
+        deadlines=MappingProxyType({
+            "Fall Transfer": "July 15",
+            "Spring Transfer": "December 31"
+        })
+    )
+})
 
 class AdmissionHandler:
     def __init__(self):
-        self.admission_requirements = {
-            AdmissionType.DOMESTIC: AdmissionRequirements(
-                documents=[
-                    "10th Mark Sheet",
-                    "12th Mark Sheet",
-                    "SRMJEEE Score Card",
-                    "Aadhar Card",
-                    "Passport size photographs"
-                ],
-                eligibility="Minimum 60% in PCM for Engineering",
-                contact_email="admissions@srmist.edu.in",
-                procedure="Apply through SRMJEEE and counselling",
-                deadlines={
-                    "SRMJEEE Registration": "April 30",
-                    "Counselling": "June-July"
-                }
-            ),
-            AdmissionType.INTERNATIONAL: AdmissionRequirements(
-                documents=[
-                    "High School Transcripts",
-                    "Standardized Test Scores (SAT/ACT)",
-                    "English Proficiency (IELTS/TOEFL)",
-                    "Passport",
-                    "Statement of Purpose"
-                ],
-                eligibility="Completed 12 years of education with good academic record",
-                contact_email="admissions.ir@srmist.edu.in",
-                procedure="Apply through International Admissions Portal",
-                deadlines={
-                    "Fall Semester": "June 30",
-                    "Spring Semester": "December 15"
-                }
-            ),
-            AdmissionType.NRI: AdmissionRequirements(
-                documents=[
-                    "NRI Status Proof",
-                    "Passport copies",
-                    "Academic transcripts",
-                    "Bank statements"
-                ],
-                eligibility="NRI/NRI Sponsored candidates",
-                contact_email="nri.admissions@srmist.edu.in",
-                procedure="Direct admission through NRI quota",
-                deadlines={
-                    "Application": "May 31",
-                    "Admission": "June 30"
-                }
-            ),
-            AdmissionType.TRANSFER: AdmissionRequirements(
-                documents=[
-                    "Current University Transcripts",
-                    "No Objection Certificate",
-                    "Migration Certificate",
-                    "Syllabus of completed courses"
-                ],
-                eligibility="Completed at least one year at recognized university",
-                contact_email="transfer.admissions@srmist.edu.in",
-                procedure="Apply with complete transcripts for credit transfer",
-                deadlines={
-                    "Fall Transfer": "July 15",
-                    "Spring Transfer": "December 31"
-                }
-            )
-        }
+        self.admission_requirements = _REQUIREMENTS
     
     def handle_admission_query(self, query: str) -> Dict[str, str]:
         """Process admission related queries and return relevant information."""
         query = query.lower()
         
-        # Determine admission type
-        admission_type = self._determine_admission_type(query)
+        # Single pass over the query collects both the admission type and the requested fields
+        admission_type, fields = self._scan_keywords(query)
         if not admission_type:
             return {
                 "error": "Unable to determine admission type. Please specify if you're asking about domestic, international, NRI, or transfer admissions."
@@ -99,43 +150,49 @@ class AdmissionHandler:
         # Extract specific information based on query keywords
         response = {}
         
-        if any(word in query for word in ["document", "require", "submit"]):
-            response["documents"] = requirements.documents
+        # The table is shared and read-only, so callers get their own list and dict to serialize or edit
+        if "documents" in fields:
+            response["documents"] = list(requirements.documents)
         
-        if any(word in query for word in ["eligible", "eligibility", "qualify"]):
+        if "eligibility" in fields:
             response["eligibility"] = requirements.eligibility
         
-        if any(word in query for word in ["procedure", "process", "how to", "steps"]):
+        if "procedure" in fields:
             response["procedure"] = requirements.procedure
         
-        if any(word in query for word in ["deadline", "date", "when"]):
-            response["deadlines"] = requirements.deadlines
+        if "deadlines" in fields:
+            response["deadlines"] = dict(requirements.deadlines)
         
-        if any(word in query for word in ["contact", "email", "reach"]):
+        if "contact" in fields:
             response["contact"] = requirements.contact_email
         
         # If no specific information was requested, return everything
         if not response:
             response = {
-                "documents": requirements.documents,
+                "documents": list(requirements.documents),
                 "eligibility": requirements.eligibility,
                 "procedure": requirements.procedure,
-                "deadlines": requirements.deadlines,
+                "deadlines": dict(requirements.deadlines),
                 "contact": requirements.contact_email
             }
         
         return response
     
-    def _determine_admission_type(self, query: str) -> Optional[AdmissionType]:
-        """Determine the type of admission being asked about."""
-        if any(word in query for word in ["international", "foreign", "abroad", "overseas"]):
-            return AdmissionType.INTERNATIONAL
-        elif any(word in query for word in ["nri", "non resident", "non-resident"]):
-            return AdmissionType.NRI
-        elif any(word in query for word in ["transfer", "change university", "credit transfer"]):
-            return AdmissionType.TRANSFER
-        elif any(word in query for word in ["domestic", "indian", "local", "srmjeee"]):
-            return AdmissionType.DOMESTIC
+    def _scan_keywords(self, query: str) -> Tuple[Optional[AdmissionType], Set[str]]:
+        """Find every admission type and field keyword in the query with one regex pass."""
+        types = set()
+        fields = set()
+        for match in _KEYWORD_RE.finditer(query):
+            bucket, value = _KEYWORDS[match.group(1)]
+            if bucket == "type":
+                types.add(value)
+            else:
+                fields.add(value)
+        
+        # Keep the original precedence when several admission types are mentioned
+        for admission_type in _TYPE_PRECEDENCE:
+            if admission_type in types:
+                return admission_type, fields
         
         # Default to domestic if no specific type is mentioned
-        return AdmissionType.DOMESTIC 
\ No newline at end of file
+        return AdmissionType.DOMESTIC, fields
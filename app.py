@@ -1,7 +1,10 @@
-from flask import Flask, request, jsonify
+from flask import Flask, Response, request
 from enhanced_chatbot import EnhancedChatbot
 from response_formatter import ResponseFormatter
+from log_queue import start_queue_logging
+from request_batcher import RequestBatcher
 import logging
+import orjson
 import time
 
 # Configure logging
@@ -9,32 +12,62 @@ logging.basicConfig(
     level=logging.INFO,
     format='%(asctime)s - %(name)s - %(levelname)s - %(message)s'
 )
+# Records are written out by a background thread instead of the request thread
+start_queue_logging()
 logger = logging.getLogger(__name__)
 
 app = Flask(__name__)
 chatbot = EnhancedChatbot()
 formatter = ResponseFormatter()
 
+# Queries from concurrent requests arriving within 20ms share one batched NLU pass
+batcher = RequestBatcher(chatbot.process_queries, max_batch_size=16, max_wait=0.02)
+REQUEST_TIMEOUT = 30
+# Longer queries are rejected before any NLU work
+MAX_QUERY_LENGTH = 2048
+
+def json_response(payload, status: int = 200) -> Response:
+    """Serialize a payload with orjson instead of Flask's stdlib-based jsonify."""
+    return Response(
+        orjson.dumps(payload, option=orjson.OPT_SERIALIZE_NUMPY),
+        status=status,
+        mimetype='application/json'
+    )
+
 @app.route('/chat', methods=['POST'])
 def chat():
     """Handle chat requests."""
     try:
         start_time = time.time()
         
-        # Get the query from the request
-        data = request.get_json()
-        if not data or 'query' not in data:
-            return jsonify({
+        # Get the query from the request; bad input is answered without a traceback in the log
+        try:
+            data = orjson.loads(request.get_data())
+        except orjson.JSONDecodeError as e:
+            logger.error("Malformed request body: %s", e)
+            return json_response({
+                'error': 'Malformed JSON',
+                'status': 'error'
+            }, 400)
+        if not isinstance(data, dict) or 'query' not in data:
+            return json_response({
                 'error': 'No query provided',
                 'status': 'error'
-            }), 400
+            }, 400)
         
         query = data['query']
-        logger.info(f"Received query: {query}")
+        # Empty, non-string and oversized queries are rejected before they reach the batch
+        if not query or not isinstance(query, str) or len(query) > MAX_QUERY_LENGTH:
+            return json_response({
+                'error': 'Invalid query',
+                'status': 'error'
+            }, 400)
+
+        logger.info("Received query: %s", query)
         
-        # Process the query
-        response_data = chatbot.process_query(query)
-        logger.info(f"Raw response: {response_data}")
+        # Process the query as part of the next batch
+        response_data = batcher.submit(query).result(timeout=REQUEST_TIMEOUT)
+        logger.info("Raw response: %s", response_data)
         
         # Format the response
         formatted_response = formatter.format_response(response_data)
@@ -54,27 +87,24 @@ def chat():
         if 'suggestions' in response_data:
             response['suggestions'] = response_data['suggestions']
         
-        logger.info(f"Sending response: {response}")
-        return jsonify(response)
+        logger.info("Sending response: %s", response)
+        return json_response(response)
         
     except Exception as e:
-        logger.error(f"Error processing request: {str(e)}", exc_info=True)
-        return jsonify({
+        logger.error("Error processing request: %s", e, exc_info=True)
+        return json_response({
             'error': 'Internal server error',
             'status': 'error'
-        }), 500
+        }, 500)
 
 @app.route('/health', methods=['GET'])
 def health_check():
     """Health check endpoint."""
-    return jsonify({
+    return json_response({
         'status': 'healthy',
         'message': 'SRMIST Chatbot is running'
     })
 
 if __name__ == '__main__':
-    # Initialize the chatbot
-    logger.info("Initializing chatbot...")
-    
-    # Run the Flask app
-    app.run(host='0.0.0.0', port=5000, debug=False) 
\ No newline at end of file
+    # Flask's development server, for local use only; see wsgi.py for production
+    app.run(host='0.0.0.0', port=5000, debug=False)
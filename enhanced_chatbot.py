@@ -1,10 +1,17 @@
-import json
 import logging
+import os
+import pickle
+import re
+import secrets
+import sys
+from collections import OrderedDict
+from copy import deepcopy
 from typing import Dict, Any, List, Tuple, Optional
-from nlu_module import NLUModule
+import numpy as np
+import orjson
+from nlu_module import EMBEDDING_DIM, NLUModule, top_k_indices
 from context_manager import ContextManager
 from response_formatter import ResponseFormatter
-import uuid
 
 # Configure logging
 logging.basicConfig(
@@ -13,12 +20,46 @@ logging.basicConfig(
 )
 logger = logging.getLogger(__name__)
 
+# Maximum number of distinct queries remembered for brand-new sessions
+STATELESS_CACHE_SIZE = 2048
+
+# Splits "entity: info" and detects the response type in one pass. The optional
+# lookaheads are tried in order, so 'located at' beats 'facilities' beats 'Contact'
+# wherever they appear in the candidate.
+_CAND_RE = re.compile(
+    r'(?:(?=.*?(?P<location>located at))|(?=.*?(?P<facilities>facilities))|(?=.*?(?P<contact>Contact)))?'
+    r'(?P<entity>[^:]*)(?::(?P<info>.*))?',
+    re.DOTALL
+)
+
+def _intern_keys(value: Any) -> Any:
+    """Intern dict keys recursively so repeated category and field names share one string."""
+    if isinstance(value, dict):
+        return {sys.intern(k) if isinstance(k, str) else k: _intern_keys(v) for k, v in value.items()}
+    if isinstance(value, list):
+        return [_intern_keys(v) for v in value]
+    return value
+
+def topk_above(scores: np.ndarray, thresh: float, k: int) -> np.ndarray:
+    """Return indices of the k highest scores above thresh, best first."""
+    candidates = np.flatnonzero(scores > thresh)
+    return candidates[top_k_indices(scores[candidates], k)]
+
 class EnhancedChatbot:
+    __slots__ = (
+        'knowledge_base', 'nlu', 'context_manager', 'response_formatter', 'active_sessions',
+        '_entity_index', '_candidates', '_candidate_embeddings', '_kb_entity_names',
+        '_kb_entity_embs', '_stateless_cache'
+    )
+
     def __init__(self, knowledge_base_path: str = 'knowledge_base.json'):
         """Initialize the enhanced chatbot with all components."""
         # Load knowledge base
         self.knowledge_base = self._load_knowledge_base(knowledge_base_path)
         
+        # Flatten the knowledge base into entity -> (category, data) for single-probe lookups
+        self._entity_index = self._build_entity_index()
+        
         # Initialize components
         self.nlu = NLUModule()
         self.context_manager = ContextManager()
@@ -26,25 +67,106 @@ class EnhancedChatbot:
         
         # Initialize conversation tracking
         self.active_sessions = {}
+        
+        # LRU of normalized query -> (response, entities, intent) for queries without prior context
+        self._stateless_cache = OrderedDict()
+        
+        # Candidate responses and entity names are static for a given knowledge base, so embed them once
+        self._build_candidate_cache()
+        self._kb_entity_names = list(self._entity_index)
+        self._kb_entity_embs = self._encode_normalized(self._kb_entity_names)
 
     def _load_knowledge_base(self, path: str) -> Dict:
         """Load the knowledge base from JSON file."""
         try:
-            with open(path, 'r', encoding='utf-8') as f:
-                return json.load(f)
+            return _intern_keys(self._load_knowledge_base_cached(path))
         except Exception as e:
-            logger.error(f"Error loading knowledge base: {str(e)}")
+            logger.error("Error loading knowledge base: %s", e)
             return {}
 
+    def _load_knowledge_base_cached(self, path: str) -> Dict:
+        """Load the knowledge base from a pickle next to the JSON, rebuilding it when stale."""
+        cache_path = path + '.pkl'
+        json_mtime = os.stat(path).st_mtime
+        try:
+            if os.stat(cache_path).st_mtime >= json_mtime:
+                with open(cache_path, 'rb') as f:
+                    return pickle.load(f)
+        except Exception:
+            pass  # Missing or unreadable cache, fall back to the JSON
+        
+        with open(path, 'rb') as f:
+            data = orjson.loads(f.read())
+        try:
+            with open(cache_path, 'wb') as f:
+                pickle.dump(data, f, protocol=pickle.HIGHEST_PROTOCOL)
+        except OSError as e:
+            logger.warning("Could not write knowledge base cache: %s", e)
+        return data
+
+    def _build_entity_index(self) -> Dict[str, Tuple[str, Dict]]:
+        """Map each entity to its category and data; the first category listing it wins."""
+        index = {}
+        for category, items in self.knowledge_base.items():
+            for entity, entity_data in items.items():
+                index.setdefault(entity, (category, entity_data))
+        return index
+
     def start_conversation(self) -> str:
         """Start a new conversation and return session ID."""
-        session_id = str(uuid.uuid4())
+        session_id = secrets.token_hex(16)
         self.context_manager.create_conversation(session_id)
         return session_id
 
     def process_query(self, query: str, session_id: str = None) -> Dict[str, Any]:
         """Process a user query and return a response."""
+        return self._process(query, session_id)
+
+    def process_queries(self, queries: List[str]) -> List[Dict[str, Any]]:
+        """Process independent queries, each in a new session, sharing one batched NLU pass."""
+        # Only queries missing from the stateless cache need to be analyzed
+        analyses = [None] * len(queries)
+        misses = [i for i, query in enumerate(queries) if self._lookup_stateless(query) is None]
+        if misses:
+            try:
+                batch = self.nlu.analyze_queries_batch([queries[i] for i in misses])
+                for i, analysis in zip(misses, batch):
+                    analyses[i] = analysis
+            except Exception as e:
+                logger.error("Error analyzing query batch: %s", e, exc_info=True)
+        
+        return [self._process(query, analysis=analysis) for query, analysis in zip(queries, analyses)]
+
+    @staticmethod
+    def _normalize_query(query: str) -> str:
+        """Lowercase a query and collapse its whitespace for cache lookups."""
+        return ' '.join(query.lower().split())
+
+    def _lookup_stateless(self, query: str) -> Optional[Tuple[Dict[str, Any], List[str], Optional[str]]]:
+        """Return the cached stateless result for a query, marking it as recently used."""
+        if not isinstance(query, str):
+            return None
+        key = self._normalize_query(query)
+        entry = self._stateless_cache.get(key)
+        if entry is not None:
+            self._stateless_cache.move_to_end(key)
+        return entry
+
+    def _remember_stateless(self, query: str, entry: Tuple[Dict[str, Any], List[str], Optional[str]]):
+        """Store a stateless result, evicting the least recently used one when full."""
+        self._stateless_cache[self._normalize_query(query)] = entry
+        if len(self._stateless_cache) > STATELESS_CACHE_SIZE:
+            self._stateless_cache.popitem(last=False)
+
+    def _process(self, query: str, session_id: str = None, analysis: Optional[Dict] = None) -> Dict[str, Any]:
+        """Run the response pipeline, reusing a precomputed analysis when one is given."""
         try:
+            # A new session has no context, so its answer depends only on the query text
+            cached = None
+            stateless = not session_id
+            if stateless:
+                cached = self._lookup_stateless(query)
+            
             # Create session if not provided
             if not session_id:
                 session_id = self.start_conversation()
@@ -52,24 +174,33 @@ class EnhancedChatbot:
             # Get current context
             context = self.context_manager.get_context(session_id)
             
-            # Analyze the query
-            analysis = self.nlu.analyze_query(query, context)
-            logger.info(f"Query analysis: {analysis}")
-            
-            # Check if it's a follow-up question
-            if analysis['is_followup'] and context:
-                response = self._handle_followup(query, analysis, context, session_id)
+            if cached is not None:
+                response, entities, intent = deepcopy(cached)
             else:
-                # Find best matching information
-                response = self._find_best_match(analysis, session_id)
+                # Analyze the query unless a batched analysis was supplied
+                if analysis is None:
+                    analysis = self.nlu.analyze_query(query, context)
+                logger.info("Query analysis: %s", analysis)
+                
+                # Check if it's a follow-up question
+                if analysis['is_followup'] and context:
+                    response = self._handle_followup(query, analysis, context, session_id)
+                else:
+                    # Find best matching information
+                    response = self._find_best_match(analysis, session_id)
+                
+                entities = analysis.get('entities', [])
+                intent = analysis.get('intent')
+                if stateless:
+                    self._remember_stateless(query, deepcopy((response, entities, intent)))
             
             # Update conversation context
             self.context_manager.update_context(
                 session_id=session_id,
                 query=query,
                 response=response,
-                entities=analysis.get('entities', []),
-                intent=analysis.get('intent')
+                entities=entities,
+                intent=intent
             )
             
             # Format the response
@@ -77,12 +208,17 @@ class EnhancedChatbot:
             
             # Add conversation metadata
             formatted_response['session_id'] = session_id
-            formatted_response['conversation_summary'] = self.context_manager.get_conversation_summary(session_id)
+            # A confident answer in a throwaway session has no history worth summarizing
+            fast_path = response.get('confidence', 0) >= 0.999
+            if fast_path and stateless:
+                formatted_response['conversation_summary'] = None
+            else:
+                formatted_response['conversation_summary'] = self.context_manager.get_conversation_summary(session_id)
             
             return formatted_response
             
         except Exception as e:
-            logger.error(f"Error processing query: {str(e)}", exc_info=True)
+            logger.error("Error processing query: %s", e, exc_info=True)
             return {
                 'type': 'error',
                 'message': "I'm sorry, but I encountered an error processing your request.",
@@ -120,68 +256,72 @@ class EnhancedChatbot:
                 if response.get('confidence', 0) > 0.6:
                     return response
         
-        # If no exact matches, try semantic search
+        # If no exact matches, try semantic search against the cached candidates
         query = analysis['processed_query']
-        candidates = self._get_candidate_responses(query)
         
-        if candidates:
-            best_matches = self.nlu.find_best_matches(query, candidates)
-            if best_matches:
-                best_match, confidence = best_matches[0]
+        if self._candidates:
+            # Batched analyses already carry the query embedding
+            query_embedding = analysis.get('query_embedding')
+            if query_embedding is None:
+                query_embedding = self.nlu.get_query_embedding(query)
+            norm = np.linalg.norm(query_embedding)
+            if norm > 0:
+                similarities = self._candidate_embeddings @ (query_embedding / norm)
+                best_index = int(np.argmax(similarities))
+                confidence = float(similarities[best_index])
                 if confidence > 0.6:
-                    return self._format_candidate_response(best_match, confidence)
+                    return self._format_candidate_response(self._candidates[best_index], confidence)
         
         # If no good matches, generate a fallback response
         return self._generate_fallback_response(analysis, session_id)
 
     def _get_entity_info(self, entity: str, intent: str) -> Dict[str, Any]:
         """Get information about an entity based on intent."""
-        # Search for the entity in the knowledge base
-        for category, items in self.knowledge_base.items():
-            if entity in items:
-                entity_data = items[entity]
-                
-                # Prepare response based on intent
-                response = {
-                    'type': intent,
-                    'entity': entity,
-                    'confidence': 1.0
-                }
-                
-                # Add relevant information based on intent
-                if intent == 'location':
-                    response.update({
-                        'address': entity_data.get('address'),
-                        'location': entity_data.get('location'),
-                        'map_link': entity_data.get('map_link')
-                    })
-                elif intent == 'description':
-                    response.update({
-                        'description': entity_data.get('description'),
-                        'type_info': entity_data.get('type'),
-                        'category': category
-                    })
-                elif intent == 'facilities':
-                    response.update({
-                        'facilities': entity_data.get('facilities', []) + entity_data.get('amenities', []),
-                        'description': entity_data.get('description')
-                    })
-                elif intent == 'contact':
-                    response.update({
-                        'contact': entity_data.get('contact'),
-                        'additional_info': entity_data.get('description')
-                    })
-                else:
-                    # For other intents, include all relevant information
-                    response.update({k: v for k, v in entity_data.items() 
-                                  if k not in ['id', 'type'] and not isinstance(v, dict)})
-                
-                return response
+        # Look the entity up in the flattened knowledge base index
+        hit = self._entity_index.get(entity)
+        if hit is None:
+            return {'confidence': 0.0}
+        category, entity_data = hit
+        
+        # Prepare response based on intent
+        response = {
+            'type': intent,
+            'entity': entity,
+            'confidence': 1.0
+        }
+        
+        # Add relevant information based on intent
+        if intent == 'location':
+            response.update({
+                'address': entity_data.get('address'),
+                'location': entity_data.get('location'),
+                'map_link': entity_data.get('map_link')
+            })
+        elif intent == 'description':
+            response.update({
+                'description': entity_data.get('description'),
+                'type_info': entity_data.get('type'),
+                'category': category
+            })
+        elif intent == 'facilities':
+            response.update({
+                'facilities': entity_data.get('facilities', []) + entity_data.get('amenities', []),
+                'description': entity_data.get('description')
+            })
+        elif intent == 'contact':
+            response.update({
+                'contact': entity_data.get('contact'),
+                'additional_info': entity_data.get('description')
+            })
+        else:
+            # For other intents, include all relevant information
+            response.update({k: v for k, v in entity_data.items() 
+                          if k not in ['id', 'type'] and not isinstance(v, dict)})
         
-        return {'confidence': 0.0}
+        return response
 
-    def _get_candidate_responses(self, query: str) -> List[str]:
-        """Get candidate responses for semantic matching."""
+    def _build_candidate_cache(self) -> None:
+        """Build candidate responses and their normalized embeddings for semantic matching."""
         candidates = []
         
         # Generate candidate responses from knowledge base
@@ -203,21 +343,30 @@ class EnhancedChatbot:
                     else:
                         candidates.append(f"Contact {entity}: {contact_info}")
         
-        return candidates
+        self._candidates = candidates
+        self._candidate_embeddings = self._encode_normalized(candidates)
+
+    def _encode_normalized(self, texts: List[str]) -> np.ndarray:
+        """Encode texts in one batched call and L2-normalize the rows."""
+        if not texts:
+            return np.zeros((0, EMBEDDING_DIM), dtype=np.float32)
+        embeddings = np.asarray(self.nlu.encode_many(texts), dtype=np.float32)
+        norms = np.linalg.norm(embeddings, axis=1, keepdims=True)
+        return embeddings / np.maximum(norms, 1e-12)
 
     def _format_candidate_response(self, candidate: str, confidence: float) -> Dict[str, Any]:
         """Format a candidate response with metadata."""
         # Split entity and information
-        parts = candidate.split(':', 1)
-        entity = parts[0].strip()
-        info = parts[1].strip() if len(parts) > 1 else ""
+        m = _CAND_RE.match(candidate)
+        entity = m['entity'].strip()
+        info = (m['info'] or '').strip()
         
         # Determine response type based on content
-        if 'located at' in candidate:
+        if m['location']:
             response_type = 'location'
-        elif 'facilities' in candidate:
+        elif m['facilities']:
             response_type = 'facilities'
-        elif 'Contact' in candidate:
+        elif m['contact']:
             response_type = 'contact'
         else:
             response_type = 'description'
@@ -236,17 +385,13 @@ class EnhancedChatbot:
         
         # Try to find similar entities based on the query
         similar_entities = []
-        if analysis.get('entities'):
-            for entity in analysis['entities']:
-                # Get embeddings for the entity
-                entity_embedding = self.nlu.get_query_embedding(entity)
-                
-                # Compare with all entities in knowledge base
-                for category, items in self.knowledge_base.items():
-                    for kb_entity in items.keys():
-                        similarity = self.nlu.get_semantic_similarity(entity, kb_entity)
-                        if similarity > 0.5:  # Threshold for similarity
-                            similar_entities.append((kb_entity, similarity))
+        if analysis.get('entities') and self._kb_entity_names:
+            # Embed all query entities at once and score them against every knowledge base entity
+            entity_embeddings = self._encode_normalized(analysis['entities'])
+            similarities = entity_embeddings @ self._kb_entity_embs.T
+            for scores in similarities:
+                for i in topk_above(scores, 0.5, 3):  # Threshold for similarity
+                    similar_entities.append((self._kb_entity_names[i], float(scores[i])))
         
         # Sort similar entities by similarity score
         similar_entities.sort(key=lambda x: x[1], reverse=True)
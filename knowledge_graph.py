@@ -1,10 +1,57 @@
-from typing import Dict, List, Any
+from typing import Dict, List, Any, NamedTuple, Optional, Set, Tuple
+from bisect import bisect_left
+from collections import OrderedDict, defaultdict
 import networkx as nx
+import numpy as np
+import re
 from datetime import datetime
 
+_TOKEN_RE = re.compile(r'\w+')
+# Number of distinct search_by_text queries memoized per graph version
+SEARCH_CACHE_SIZE = 4096
+# Graphs with fewer nodes than this are searched by scanning every node's text; below it the
+# index lookups cost more than the scan they save
+INDEX_MIN_NODES = 64
+
+class _Adjacency(NamedTuple):
+    """Read-only CSR snapshot of the graph's edges."""
+    node2id: Dict[str, int]
+    id2node: List[str]
+    indptr: np.ndarray
+    indices: np.ndarray
+    rel: np.ndarray
+    rel2id: Dict[str, int]
+    rel_names: List[str]
+
 class SRMKnowledgeGraph:
+    __slots__ = (
+        'graph', 'entities', '_nodes_by_type', '_inverted', '_node_tokens',
+        '_node_search_blob', '_node_by_key', '_vocabulary', '_node_rank', '_adjacency', 'version',
+        '_search_cache', '_search_cache_version'
+    )
+
     def __init__(self):
         self.graph = nx.MultiDiGraph()
+        # Node ids bucketed by their 'type' attribute so queries only visit one type
+        self._nodes_by_type = defaultdict(list)
+        # Inverted index of lowercased word tokens -> node ids, used to narrow text searches
+        self._inverted = defaultdict(set)
+        self._node_tokens = {}
+        # Sorted tokens and sorted reversed tokens for prefix/suffix lookups, rebuilt when tokens change
+        self._vocabulary: Optional[Tuple[List[str], List[str]]] = None
+        # Node id -> position in graph order, so narrowed searches keep the full scan's result order
+        self._node_rank: Optional[Dict[str, int]] = None
+        # One lowercased string per node holding its id and searchable values
+        self._node_search_blob = {}
+        # Casefolded node id -> node id, so entities extracted in any case find their node
+        self._node_by_key: Dict[str, str] = {}
+        # CSR edge arrays for get_related_entities, rebuilt lazily after edges change
+        self._adjacency: Optional[_Adjacency] = None
+        # Bumped on every node or edge change so callers can invalidate derived caches
+        self.version = 0
+        # Lowercased query -> search_by_text hits, valid only while version is unchanged
+        self._search_cache: 'OrderedDict[str, List[Dict[str, Any]]]' = OrderedDict()
+        self._search_cache_version = 0
         self.entities = {
             'campuses': {
                 'Kattankulathur': {
@@ -107,30 +154,175 @@ class SRMKnowledgeGraph:
         """Builds the initial knowledge graph structure."""
         # Add campus nodes
         for campus, details in self.entities['campuses'].items():
-            self.graph.add_node(campus, type='campus', **details)
+            self._add_node(campus, 'campus', **details)
         
         # Add location nodes and relationships
         for location, details in self.entities['locations'].items():
-            self.graph.add_node(location, type='location', **details)
+            self._add_node(location, 'location', **details)
             campus = details['location']
-            self.graph.add_edge(campus, location, relationship='has_location')
+            self._add_edge(campus, location, 'has_location')
         
         # Add program nodes and relationships
         for program, details in self.entities['programs'].items():
-            self.graph.add_node(program, type='program', **details)
-            for campus in self.entities['campuses']:
-                self.graph.add_edge(campus, program, relationship='offers')
-                for degree in details['degrees']:
-                    self.graph.add_node(f"{program}_{degree}", type='degree',
-                                      program=program, degree=degree)
-                    self.graph.add_edge(program, f"{program}_{degree}",
-                                      relationship='has_degree')
+            self._add_node(program, 'program', **details)
+            # Degrees belong to the program, not to a campus, so create them once
+            for degree in details['degrees']:
+                degree_node = f"{program}_{degree}"
+                self._add_node(degree_node, 'degree', program=program, degree=degree)
+                self._add_edge(program, degree_node, 'has_degree')
+        for campus in self.entities['campuses']:
+            for program in self.entities['programs']:
+                self._add_edge(campus, program, 'offers')
         
         # Add facility nodes
         for facility_type, details in self.entities['facilities'].items():
-            self.graph.add_node(facility_type, type='facility', **details)
+            self._add_node(facility_type, 'facility', **details)
             for campus in self.entities['campuses']:
-                self.graph.add_edge(campus, facility_type, relationship='has_facility')
+                self._add_edge(campus, facility_type, 'has_facility')
+        
+        # Edges can implicitly create attribute-less nodes; make sure they are searchable too
+        for node_id in self.graph:
+            if node_id not in self._node_tokens:
+                self._index_node(node_id)
+    
+    def _add_node(self, node_id: str, entity_type: str, **attributes):
+        """Add or update a node and keep the type index in sync."""
+        previous_type = self.graph.nodes[node_id].get('type') if node_id in self.graph else None
+        self.graph.add_node(node_id, type=entity_type, **attributes)
+        if previous_type != entity_type:
+            if previous_type is not None:
+                self._nodes_by_type[previous_type].remove(node_id)
+            self._nodes_by_type[entity_type].append(node_id)
+        self._index_node(node_id)
+        self.version += 1
+    
+    def _add_edge(self, from_entity: str, to_entity: str, relationship_type: str):
+        """Add an edge and invalidate the CSR snapshot and dependent caches."""
+        self.graph.add_edge(from_entity, to_entity, relationship=relationship_type)
+        self._adjacency = None
+        self.version += 1
+    
+    def _build_adjacency(self) -> _Adjacency:
+        """Pack the graph's edges into CSR arrays, keeping the order edges() yields them in."""
+        id2node = list(self.graph)
+        node2id = {node_id: i for i, node_id in enumerate(id2node)}
+        rel2id: Dict[str, int] = {}
+        indptr = np.zeros(len(id2node) + 1, dtype=np.int32)
+        indices = []
+        rels = []
+        for i, node_id in enumerate(id2node):
+            for neighbor, edges in self.graph.adj[node_id].items():
+                for edge_data in edges.values():
+                    indices.append(node2id[neighbor])
+                    rels.append(rel2id.setdefault(edge_data.get('relationship'), len(rel2id)))
+            indptr[i + 1] = len(indices)
+        
+        # Assign in one step so concurrent readers never see a half-built snapshot
+        self._adjacency = _Adjacency(
+            node2id, id2node, indptr,
+            np.array(indices, dtype=np.int32), np.array(rels, dtype=np.int32),
+            rel2id, list(rel2id)
+        )
+        return self._adjacency
+    
+    def _index_node(self, node_id: str):
+        """(Re)index the searchable text of a node in the inverted index and search blobs."""
+        for token in self._node_tokens.get(node_id, ()):
+            postings = self._inverted[token]
+            postings.discard(node_id)
+            if not postings:
+                del self._inverted[token]
+                self._vocabulary = None
+        
+        self._node_by_key[node_id.casefold()] = node_id
+        
+        # Same values search_by_text matches against: id, strings, and list/dict items
+        texts = [node_id]
+        for value in self.graph.nodes[node_id].values():
+            if isinstance(value, str):
+                texts.append(value)
+            elif isinstance(value, list):
+                texts.extend(str(v) for v in value)
+            elif isinstance(value, dict):
+                texts.extend(str(v) for v in value.values())
+        
+        # NUL separators keep a query from matching across two different values
+        blob = '\0'.join(texts).lower()
+        self._node_search_blob[node_id] = blob
+        
+        tokens = set(_TOKEN_RE.findall(blob))
+        for token in tokens:
+            if token not in self._inverted:
+                self._vocabulary = None
+            self._inverted[token].add(node_id)
+        self._node_tokens[node_id] = tokens
+        self._node_rank = None
+    
+    def _candidate_nodes(self, query: str) -> Optional[Set[str]]:
+        """
+        Narrow a lowercased substring query down to nodes that can possibly match.
+        
+        A word with query text on both sides must be a whole token of the node, so its
+        postings are one dict lookup. A word cut off only at the end of the query is a
+        prefix of some token, and one cut off only at the start is a suffix; both are
+        found by bisecting the sorted vocabulary. Returns None when no word bounds the
+        search, e.g. a single bare word, and every node must be checked.
+        """
+        words = list(_TOKEN_RE.finditer(query))
+        if not words:
+            return None
+        
+        candidates = None
+        for match in words:
+            word = match.group()
+            open_start = match.start() == 0
+            open_end = match.end() == len(query)
+            if open_start and open_end:
+                # Any substring of any token could match; the index cannot narrow this word
+                continue
+            if not open_start and not open_end:
+                nodes = self._inverted.get(word, set())
+            elif open_end:
+                nodes = self._postings_for_prefix(word)
+            else:
+                nodes = self._postings_for_suffix(word)
+            candidates = nodes if candidates is None else candidates & nodes
+            if not candidates:
+                return set()
+        return candidates
+    
+    def _sorted_vocabulary(self) -> Tuple[List[str], List[str]]:
+        """Return the sorted tokens and sorted reversed tokens, rebuilding them after index changes."""
+        if self._vocabulary is None:
+            self._vocabulary = (sorted(self._inverted), sorted(token[::-1] for token in self._inverted))
+        return self._vocabulary
+    
+    def _postings_for_prefix(self, prefix: str) -> Set[str]:
+        """Nodes holding a token that starts with prefix."""
+        tokens = self._sorted_vocabulary()[0]
+        nodes = set()
+        for i in range(bisect_left(tokens, prefix), len(tokens)):
+            if not tokens[i].startswith(prefix):
+                break
+            nodes |= self._inverted[tokens[i]]
+        return nodes
+    
+    def _postings_for_suffix(self, suffix: str) -> Set[str]:
+        """Nodes holding a token that ends with suffix."""
+        reversed_tokens = self._sorted_vocabulary()[1]
+        reversed_suffix = suffix[::-1]
+        nodes = set()
+        for i in range(bisect_left(reversed_tokens, reversed_suffix), len(reversed_tokens)):
+            if not reversed_tokens[i].startswith(reversed_suffix):
+                break
+            nodes |= self._inverted[reversed_tokens[i][::-1]]
+        return nodes
+    
+    def resolve_id(self, entity: str) -> Optional[str]:
+        """Return the id of the node named by entity, compared case-insensitively, or None."""
+        if entity in self.graph:
+            return entity
+        return self._node_by_key.get(entity.casefold())
     
     def query(self, entity_type: str, filters: Dict[str, Any] = None) -> List[Dict[str, Any]]:
         """
@@ -143,14 +335,10 @@ class SRMKnowledgeGraph:
         Returns:
             List of matching entities with their attributes
         """
-        results = []
-        for node in self.graph.nodes(data=True):
-            node_id, attrs = node
+        results: Dict[str, Dict[str, Any]] = {}
+        for node_id in self._nodes_by_type.get(entity_type, ()):
+            attrs = self.graph.nodes[node_id]
             
-            # Skip if node type doesn't match
-            if 'type' not in attrs or attrs['type'] != entity_type:
-                continue
-                
             # Check if node matches all filters
             if filters:
                 matches_filters = all(
@@ -160,57 +348,115 @@ class SRMKnowledgeGraph:
                 if not matches_filters:
                     continue
             
-            # Add matching node to results
-            results.append({'id': node_id, **attrs})
+            # Add matching node to results, keyed by id so each node appears once
+            results[node_id] = {'id': node_id, **attrs}
         
-        return results
+        return list(results.values())
+    
+    def query_multi(
+        self, 
+        entity_ids: List[str], 
+        entity_types: Tuple[str, ...]
+    ) -> Dict[str, Tuple[str, List[Dict[str, Any]]]]:
+        """
+        Look up several entities by id in a single pass.
+        
+        Args:
+            entity_ids: Node ids to look up, in any case
+            entity_types: Entity types to accept; nodes of any other type are skipped
+            
+        Returns:
+            Map of each id found, as given, to its type and its rows, shaped like query's results
+        """
+        nodes = self.graph.nodes
+        found: Dict[str, Tuple[str, List[Dict[str, Any]]]] = {}
+        for entity_id in entity_ids:
+            if entity_id in found:
+                continue
+            node_id = self.resolve_id(entity_id)
+            if node_id is None:
+                continue
+            attrs = nodes[node_id]
+            if attrs.get('type') in entity_types:
+                found[entity_id] = (attrs['type'], [{'id': node_id, **attrs}])
+        return found
     
     def get_related_entities(self, entity_id: str, relationship_type: str = None) -> List[Dict[str, Any]]:
         """Get entities related to the given entity."""
+        adjacency = self._adjacency or self._build_adjacency()
+        i = adjacency.node2id.get(entity_id)
+        if i is None:
+            return []
+        
+        # Slice this node's row out of the CSR arrays
+        start, end = adjacency.indptr[i], adjacency.indptr[i + 1]
+        neighbors = adjacency.indices[start:end]
+        rels = adjacency.rel[start:end]
+        if relationship_type:
+            rel_id = adjacency.rel2id.get(relationship_type)
+            if rel_id is None:
+                return []
+            keep = rels == rel_id
+            neighbors = neighbors[keep]
+            rels = rels[keep]
+        
         related = []
-        for _, neighbor, edge_data in self.graph.edges(entity_id, data=True):
-            if relationship_type and edge_data.get('relationship') != relationship_type:
-                continue
+        for neighbor_id, rel_id in zip(neighbors.tolist(), rels.tolist()):
+            neighbor = adjacency.id2node[neighbor_id]
             neighbor_data = self.graph.nodes[neighbor]
             related.append({
                 'id': neighbor,
-                'relationship': edge_data.get('relationship'),
+                'relationship': adjacency.rel_names[rel_id],
                 **neighbor_data
             })
         return related
 
     def add_entity(self, entity_id: str, entity_type: str, attributes: Dict[str, Any] = None):
         """Add a new entity to the knowledge graph."""
-        self.graph.add_node(entity_id, type=entity_type, **(attributes or {}))
+        self._add_node(entity_id, entity_type, **(attributes or {}))
     
     def add_relationship(self, from_entity: str, to_entity: str, relationship_type: str):
         """Add a relationship between two entities."""
-        self.graph.add_edge(from_entity, to_entity, relationship=relationship_type)
+        self._add_edge(from_entity, to_entity, relationship_type)
+        for node_id in (from_entity, to_entity):
+            if node_id not in self._node_tokens:
+                self._index_node(node_id)
         
     def search_by_text(self, query: str) -> List[Dict[str, Any]]:
         """Search for entities by matching text in their attributes."""
-        results = []
         query = query.lower()
+        if self._search_cache_version != self.version:
+            self._search_cache.clear()
+            self._search_cache_version = self.version
+        cached = self._search_cache.get(query)
+        if cached is None:
+            cached = self._scan_text(query)
+            self._search_cache[query] = cached
+            if len(self._search_cache) > SEARCH_CACHE_SIZE:
+                self._search_cache.popitem(last=False)
+        else:
+            self._search_cache.move_to_end(query)
+        # Fresh dicts so callers can't alter the memoized hits
+        return [dict(result) for result in cached]
+    
+    def _scan_text(self, query: str) -> List[Dict[str, Any]]:
+        """Find the nodes whose search text contains the lowercased query, in graph order."""
+        nodes = self.graph.nodes
+        blobs = self._node_search_blob
+        candidates = self._candidate_nodes(query) if len(blobs) >= INDEX_MIN_NODES else None
+        if candidates is None:
+            # Single substring check against each node's precomputed search text
+            return [{'id': node_id, **attrs} for node_id, attrs in nodes(data=True) if query in blobs[node_id]]
         
-        for node in self.graph.nodes(data=True):
-            node_id, attrs = node
-            
-            # Check node ID
-            if query in node_id.lower():
-                results.append({'id': node_id, **attrs})
-                continue
-            
-            # Check attribute values
-            for key, value in attrs.items():
-                if isinstance(value, str) and query in value.lower():
-                    results.append({'id': node_id, **attrs})
-                    break
-                elif isinstance(value, list) and any(query in str(v).lower() for v in value):
-                    results.append({'id': node_id, **attrs})
-                    break
-                elif isinstance(value, dict):
-                    if any(query in str(v).lower() for v in value.values()):
-                        results.append({'id': node_id, **attrs})
-                        break
-        
-        return results 
\ No newline at end of file
+        # Only the nodes the inverted index left over are checked
+        if self._node_rank is None:
+            self._node_rank = {node_id: i for i, node_id in enumerate(self.graph)}
+        return [
+            {'id': node_id, **nodes[node_id]}
+            for node_id in sorted(candidates, key=self._node_rank.__getitem__)
+            if query in blobs[node_id]
+        ]
+    
+    def search_by_text_many(self, queries: List[str]) -> Dict[str, List[Dict[str, Any]]]:
+        """Run search_by_text for each distinct query, keyed by query in first-seen order."""
+        return {query: self.search_by_text(query) for query in dict.fromkeys(queries)}
\ No newline at end of file
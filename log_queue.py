@@ -0,0 +1,57 @@
+from logging.handlers import QueueHandler, QueueListener
+import atexit
+import logging
+import os
+import queue
+
+_listener = None
+
+class _DeferredFormatQueueHandler(QueueHandler):
+    """QueueHandler that enqueues records untouched, leaving all formatting to the listener thread."""
+
+    def prepare(self, record):
+        # The stock prepare() formats the message and traceback here, on the request thread. The
+        # queue never leaves this process, so the record can travel as is
+        return record
+
+def start_queue_logging():
+    """
+    Move the root logger's handlers behind a queue drained by a background thread.
+
+    Request threads then only enqueue records; message formatting, tracebacks and
+    the stream writes all happen on the listener thread. Calling this again, or after handlers are already queued, does
+    nothing.
+    """
+    root = logging.getLogger()
+    handlers = [handler for handler in root.handlers if not isinstance(handler, QueueHandler)]
+    if _listener is not None or not handlers:
+        return
+
+    log_queue = queue.SimpleQueue()
+    for handler in handlers:
+        root.removeHandler(handler)
+    root.addHandler(_DeferredFormatQueueHandler(log_queue))
+    _start_listener(log_queue, handlers)
+    atexit.register(_stop_listener)
+    # Threads do not survive fork(), so a preloaded server's workers each need their own listener
+    if hasattr(os, 'register_at_fork'):
+        os.register_at_fork(after_in_child=lambda: _restart_listener(handlers))
+
+def _start_listener(log_queue, handlers):
+    """Start the thread that hands queued records to the real handlers."""
+    global _listener
+    _listener = QueueListener(log_queue, *handlers, respect_handler_level=True)
+    _listener.start()
+
+def _stop_listener():
+    """Flush the queue and stop the listener thread."""
+    if _listener is not None:
+        _listener.stop()
+
+def _restart_listener(handlers):
+    """Give a forked child a fresh queue and its own listener thread."""
+    log_queue = queue.SimpleQueue()
+    for handler in logging.getLogger().handlers:
+        if isinstance(handler, QueueHandler):
+            handler.queue = log_queue
+    _start_listener(log_queue, handlers)
@@ -1,34 +1,207 @@
-from typing import Dict, List, Tuple, Optional
+from typing import Any, Dict, List, Tuple, Optional
+from collections import OrderedDict
+from functools import lru_cache
+from itertools import groupby
+import os
 import numpy as np
-from sentence_transformers import SentenceTransformer
-from sklearn.metrics.pairwise import cosine_similarity
-import nltk
-from nltk.tokenize import word_tokenize, sent_tokenize
-from nltk.corpus import stopwords
 import logging
 import re
+import threading
+
+from request_batcher import RequestBatcher
+
+# torch, sentence_transformers, nltk and the optional faiss/optimum backends are imported
+# where they are first used, so importing this module stays cheap
+
+# google-re2 is optional; its linear-time automaton replaces re for the question/intent tables
+try:
+    import re2 as _pattern_engine
+except ImportError:
+    _pattern_engine = re
 
 # Configure logging
 logging.basicConfig(level=logging.INFO)
 logger = logging.getLogger(__name__)
 
+MODEL_NAME = 'sentence-transformers/all-MiniLM-L6-v2'
+# Where the exported and INT8-quantized ONNX model is kept between runs
+ONNX_MODEL_DIR = os.path.join(os.path.dirname(os.path.abspath(__file__)), 'onnx_models', 'all-MiniLM-L6-v2-int8')
+# Embedding size of all-MiniLM-L6-v2
+EMBEDDING_DIM = 384
+# Maximum number of distinct texts whose embeddings are kept in memory
+EMBEDDING_CACHE_SIZE = 4096
+# Single-query embeddings from concurrent threads are coalesced for up to this long
+EMBEDDING_BATCH_SIZE = 32
+EMBEDDING_BATCH_WAIT = 0.005
+# Words and single punctuation marks, splitting the same fused words as the Treebank
+# tokenizer ("cannot" -> "can", "not"); matches word_tokenize on preprocessed text
+_TOKEN_RE = re.compile(r"\b(?:can(?=not\b)|gim(?=me\b)|gon(?=na\b)|got(?=ta\b)|lem(?=me\b)|wan(?=na\b))|\w+|[^\w\s]")
+# Characters preprocess_text replaces with spaces, plus an equivalent ASCII translate table
+_SPECIAL_CHARS_RE = re.compile(r'[^\w\s?]')
+_SPECIAL_CHARS_TO_SPACE = str.maketrans({
+    c: ' ' for c in map(chr, range(128)) if _SPECIAL_CHARS_RE.match(c)
+})
+# Pronouns referring to previous context and phrases that continue a conversation
+_FOLLOWUP_PRONOUNS = ('it', 'this', 'that', 'they', 'these', 'those', 'there')
+_FOLLOWUP_PHRASES = (
+    'what about',
+    'how about',
+    'tell me more',
+    'and',
+    'also',
+    'what else',
+    'more information'
+)
+_FOLLOWUP_RE = re.compile(
+    ' (?:' + '|'.join(_FOLLOWUP_PRONOUNS) + ') |' + '|'.join(re.escape(p) for p in _FOLLOWUP_PHRASES)
+)
+_FOLLOWUP_CONJUNCTIONS = ('and', 'but', 'or', 'so')
+# Number of processed queries whose full analysis is kept for exact repeats
+ANALYSIS_CACHE_SIZE = 2048
+# Number of queries kept in the semantic cache, and the cosine similarity that counts as a hit
+SEMANTIC_CACHE_SIZE = 1024
+SEMANTIC_CACHE_THRESHOLD = 0.95
+# Indexed candidate sets larger than this are searched through FAISS when it is installed
+FAISS_MIN_CANDIDATES = 10000
+# Upper token-length bounds of the buckets texts are grouped into before encoding
+LENGTH_BUCKETS = (2, 4, 8, 16, 32, 64, 128)
+
+def top_k_indices(scores: np.ndarray, k: int) -> np.ndarray:
+    """Indices of the k highest scores, best first, via an O(n) partition instead of a full sort."""
+    k = min(k, len(scores))
+    if k <= 0:
+        return np.empty(0, dtype=np.intp)
+    top = np.argpartition(-scores, k - 1)[:k]
+    return top[np.argsort(-scores[top], kind='stable')]
+
+def _is_noun_tag(tagged_word: Tuple[str, str]) -> bool:
+    """Whether a (word, tag) pair is a noun; NN covers NNS, NNP and NNPS too."""
+    return tagged_word[1].startswith('NN')
+
+@lru_cache(maxsize=1)
+def _ensure_nltk_data():
+    """Download the NLTK resources this module needs, once per process."""
+    import nltk
+    try:
+        nltk.data.find('tokenizers/punkt')
+        nltk.data.find('corpora/stopwords')
+    except LookupError:
+        nltk.download('punkt')
+        nltk.download('stopwords')
+        nltk.download('averaged_perceptron_tagger')
+
+@lru_cache(maxsize=1)
+def _stopwords() -> frozenset:
+    """Load the English stopword list once per process."""
+    _ensure_nltk_data()
+    from nltk.corpus import stopwords
+    return frozenset(stopwords.words('english'))
+
+@lru_cache(maxsize=1)
+def _pos_tagger():
+    """Load the POS tagger once per process instead of on every nltk.pos_tag call."""
+    _ensure_nltk_data()
+    from nltk.tag import PerceptronTagger
+    return PerceptronTagger()
+
+class OnnxSentenceEncoder:
+    """SentenceTransformer.encode replacement backed by a dynamically quantized ONNX Runtime model."""
+    
+    def __init__(self, model_dir: str = ONNX_MODEL_DIR):
+        from optimum.onnxruntime import ORTModelForFeatureExtraction
+        from transformers import AutoTokenizer
+        
+        if not os.path.isdir(model_dir):
+            self._export(model_dir)
+        self.tokenizer = AutoTokenizer.from_pretrained(model_dir)
+        self.session = ORTModelForFeatureExtraction.from_pretrained(model_dir, file_name='model_quantized.onnx')
+    
+    @staticmethod
+    def _export(model_dir: str):
+        """Export the model to ONNX and quantize its weights to INT8 for VNNI-capable CPUs."""
+        from optimum.onnxruntime import ORTModelForFeatureExtraction, ORTQuantizer
+        from optimum.onnxruntime.configuration import AutoQuantizationConfig
+        from transformers import AutoTokenizer
+        
+        export_dir = model_dir + '-fp32'
+        ORTModelForFeatureExtraction.from_pretrained(MODEL_NAME, export=True).save_pretrained(export_dir)
+        AutoTokenizer.from_pretrained(MODEL_NAME).save_pretrained(model_dir)
+        quantizer = ORTQuantizer.from_pretrained(export_dir)
+        quantizer.quantize(
+            save_dir=model_dir,
+            quantization_config=AutoQuantizationConfig.avx512_vnni(is_static=False, per_channel=False)
+        )
+    
+    def encode(self, sentences, batch_size: int = 32, convert_to_numpy: bool = True,
+               normalize_embeddings: bool = False, **kwargs) -> np.ndarray:
+        """Mean-pooled sentence embeddings, matching SentenceTransformer.encode's output."""
+        single = isinstance(sentences, str)
+        if single:
+            sentences = [sentences]
+        
+        batches = []
+        for start in range(0, len(sentences), batch_size):
+            inputs = self.tokenizer(
+                sentences[start:start + batch_size],
+                padding=True, truncation=True, max_length=256, return_tensors='np'
+            )
+            token_embeddings = np.asarray(self.session(**inputs).last_hidden_state, dtype=np.float32)
+            mask = inputs['attention_mask'][..., None].astype(np.float32)
+            batches.append((token_embeddings * mask).sum(axis=1) / np.maximum(mask.sum(axis=1), 1e-9))
+        
+        embeddings = np.concatenate(batches) if batches else np.zeros((0, EMBEDDING_DIM), dtype=np.float32)
+        if normalize_embeddings:
+            embeddings /= np.maximum(np.linalg.norm(embeddings, axis=1, keepdims=True), 1e-12)
+        return embeddings[0] if single else embeddings
+
+_torch_threads_configured = False
+
+def _configure_torch_threads():
+    """Let intra-op kernels use every core (or NLU_THREADS); done once per process."""
+    global _torch_threads_configured
+    if _torch_threads_configured:
+        return
+    _torch_threads_configured = True
+    import torch
+    torch.set_num_threads(int(os.environ.get('NLU_THREADS', os.cpu_count() or 1)))
+    try:
+        torch.set_num_interop_threads(1)
+    except RuntimeError as e:
+        # Only allowed before any inter-op work has started in this process
+        logger.warning("Could not set inter-op threads: %s", e)
+
 class NLUModule:
+    # Sentence encoder shared by every instance, loaded on first use
+    _model = None
+    _model_lock = threading.Lock()
+
     def __init__(self):
         """Initialize the NLU module with necessary models and resources."""
-        # Initialize sentence transformer model
-        self.model = SentenceTransformer('all-MiniLM-L6-v2')
+        # LRU of text -> embedding shared by every encoding helper
+        self._emb_cache = OrderedDict()
+        self._emb_cache_lock = threading.Lock()
+        # Cache misses from get_query_embedding share one encode call per batching window
+        self._embedding_batcher = RequestBatcher(
+            self.encode_many, max_batch_size=EMBEDDING_BATCH_SIZE, max_wait=EMBEDDING_BATCH_WAIT
+        )
         
-        # Download required NLTK data
-        try:
-            nltk.data.find('tokenizers/punkt')
-            nltk.data.find('corpora/stopwords')
-        except LookupError:
-            nltk.download('punkt')
-            nltk.download('stopwords')
-            nltk.download('averaged_perceptron_tagger')
+        # LRU of processed query -> analysis for exact repeats
+        self._analysis_cache = OrderedDict()
+        self._analysis_cache_lock = threading.Lock()
+        
+        # Semantic cache: entities of recent queries, looked up by embedding similarity
+        self._sem_cache_vecs = np.zeros((SEMANTIC_CACHE_SIZE, EMBEDDING_DIM), dtype=np.float32)
+        self._sem_cache_vals: List[Optional[Tuple[str, ...]]] = [None] * SEMANTIC_CACHE_SIZE
+        self._sem_cache_used = np.zeros(SEMANTIC_CACHE_SIZE, dtype=np.int64)
+        self._sem_cache_size = 0
+        self._sem_cache_clock = 0
+        self._sem_cache_lock = threading.Lock()
+        
+        # (texts, normalized float32 matrix, optional FAISS index) set by index_candidates
+        self._candidate_index = None
         
-        # Initialize stopwords
-        self.stop_words = set(stopwords.words('english'))
+        # Entities depend only on the text, so remember recent extractions
+        self._extract_entities_cached = lru_cache(maxsize=4096)(self._extract_entities)
         
         # Question type patterns
         self.question_patterns = {
@@ -98,45 +271,120 @@ class NLUModule:
                 r'explain'
             ]
         }
+        
+        # One alternation per category so each category costs a single scan of the text
+        self._question_type_res = {
+            q_type: _pattern_engine.compile('|'.join(f'(?:{pattern})' for pattern in patterns))
+            for q_type, patterns in self.question_patterns.items()
+        }
+        self._intent_res = {
+            intent: _pattern_engine.compile('|'.join(re.escape(pattern) for pattern in patterns))
+            for intent, patterns in self.intent_patterns.items()
+        }
+
+    def close(self):
+        """Stop the embedding batcher's worker thread; the module cannot encode single queries afterwards."""
+        self._embedding_batcher.close()
+
+    @property
+    def stop_words(self) -> frozenset:
+        """English stopwords, read from the NLTK corpus the first time they are needed."""
+        return _stopwords()
+
+    @property
+    def model(self):
+        """The shared sentence encoder, loaded by whichever instance needs it first."""
+        if NLUModule._model is None:
+            with NLUModule._model_lock:
+                if NLUModule._model is None:
+                    _configure_torch_threads()
+                    NLUModule._model = self._load_encoder()
+        return NLUModule._model
+
+    @staticmethod
+    def _load_encoder():
+        """Prefer FP16 on a GPU, then the quantized ONNX model on CPU, else the PyTorch one."""
+        import torch
+        from sentence_transformers import SentenceTransformer
+        
+        if torch.cuda.is_available():
+            if hasattr(torch, 'set_float32_matmul_precision'):
+                torch.set_float32_matmul_precision('high')
+            model = SentenceTransformer('all-MiniLM-L6-v2', device='cuda')
+            model.half()
+            # Fused SDPA attention kernels; needs optimum, so keep eager attention without it
+            try:
+                first_module = model._first_module()
+                first_module.auto_model = first_module.auto_model.to_bettertransformer()
+            except Exception as e:
+                logger.warning("BetterTransformer unavailable, using eager attention: %s", e)
+            return NLUModule._compile_encoder(model, mode='reduce-overhead')
+        
+        try:
+            return OnnxSentenceEncoder()
+        except ImportError:
+            pass  # ONNX Runtime is optional
+        except Exception as e:
+            logger.warning("Falling back to PyTorch encoder, ONNX model unavailable: %s", e)
+        return NLUModule._compile_encoder(SentenceTransformer('all-MiniLM-L6-v2'))
+
+    @staticmethod
+    def _compile_encoder(model, mode: str = 'default'):
+        """Fuse the transformer's kernels with torch.compile and warm it up, keeping eager mode on failure."""
+        import torch
+        
+        version = tuple(int(part) for part in re.findall(r'\d+', torch.__version__)[:2])
+        if not hasattr(torch, 'compile') or version < (2, 1):
+            return model
+        
+        first_module = model._first_module()
+        eager = first_module.auto_model
+        try:
+            # dynamic shapes so each new padded length does not trigger a recompile
+            first_module.auto_model = torch.compile(eager, mode=mode, dynamic=True, fullgraph=False)
+            # Compilation happens on the first forward pass, so pay for it before serving traffic
+            model.encode(['warmup'] * 2, batch_size=2)
+        except Exception as e:
+            first_module.auto_model = eager
+            logger.warning("torch.compile unavailable, using the eager model: %s", e)
+        return model
 
     def preprocess_text(self, text: str) -> str:
         """Preprocess text by cleaning and normalizing."""
         # Convert to lowercase
         text = text.lower()
         
-        # Remove special characters and extra whitespace
-        text = re.sub(r'[^\w\s?]', ' ', text)
+        # Remove special characters and extra whitespace; ASCII text takes the single-pass table
+        if text.isascii():
+            text = text.translate(_SPECIAL_CHARS_TO_SPACE)
+        else:
+            text = _SPECIAL_CHARS_RE.sub(' ', text)
         text = ' '.join(text.split())
         
         return text
 
     def extract_entities(self, text: str) -> List[str]:
         """Extract potential entities from the text using POS tagging."""
-        tokens = word_tokenize(text)
-        pos_tags = nltk.pos_tag(tokens)
-        
-        # Extract noun phrases (potential entities)
-        entities = []
-        current_entity = []
-        
-        for word, tag in pos_tags:
-            if tag.startswith(('NN', 'NNP', 'NNPS')):
-                current_entity.append(word)
-            elif current_entity:
-                entities.append(' '.join(current_entity))
-                current_entity = []
-        
-        if current_entity:
-            entities.append(' '.join(current_entity))
+        return list(self._extract_entities_cached(text))
+
+    def _extract_entities(self, text: str) -> Tuple[str, ...]:
+        """Tokenize, tag and group consecutive nouns into entity phrases."""
+        tokens = _TOKEN_RE.findall(text)
+        pos_tags = _pos_tagger().tag(tokens)
         
-        return entities
+        # Extract noun phrases (potential entities) as runs of consecutive noun tags
+        return tuple(
+            ' '.join(word for word, _ in run)
+            for is_noun, run in groupby(pos_tags, key=_is_noun_tag)
+            if is_noun
+        )
 
     def detect_question_type(self, text: str) -> str:
         """Detect the type of question (factual, procedural, comparative, yes_no)."""
         text = text.lower().strip()
         
-        for q_type, patterns in self.question_patterns.items():
-            if any(re.search(pattern, text) for pattern in patterns):
+        for q_type, pattern in self._question_type_res.items():
+            if pattern.search(text):
                 return q_type
         
         return 'other'
@@ -145,50 +393,37 @@ class NLUModule:
         """Detect the intent of the query."""
         text = text.lower().strip()
         
-        for intent, patterns in self.intent_patterns.items():
-            if any(pattern in text for pattern in patterns):
+        for intent, pattern in self._intent_res.items():
+            if pattern.search(text):
                 return intent
         
         return 'general'
 
     def is_followup_question(self, text: str, context: Dict) -> bool:
         """Determine if the question is a follow-up to previous conversation."""
+        # Without earlier turns there is nothing to follow up on
+        if not context:
+            return False
+        
         text = text.lower()
         
-        # Check for pronouns referring to previous context
-        pronouns = ['it', 'this', 'that', 'they', 'these', 'those', 'there']
-        has_pronouns = any(f" {p} " in f" {text} " for p in pronouns)
-        
-        # Check for follow-up phrases
-        followup_phrases = [
-            'what about',
-            'how about',
-            'tell me more',
-            'and',
-            'also',
-            'what else',
-            'more information'
-        ]
-        has_followup = any(phrase in text for phrase in followup_phrases)
+        # One scan finds a space-delimited pronoun referring to previous context or a follow-up phrase
+        if _FOLLOWUP_RE.search(f" {text} "):
+            return True
         
         # Check if the question starts with a conjunction
-        starts_with_conjunction = any(text.startswith(conj) for conj in ['and', 'but', 'or', 'so'])
-        
-        return has_pronouns or has_followup or starts_with_conjunction
+        return text.startswith(_FOLLOWUP_CONJUNCTIONS)
 
     def get_semantic_similarity(self, text1: str, text2: str) -> float:
         """Calculate semantic similarity between two texts."""
         try:
-            # Encode both texts
-            embedding1 = self.model.encode([text1])[0]
-            embedding2 = self.model.encode([text2])[0]
-            
-            # Calculate cosine similarity
-            similarity = cosine_similarity([embedding1], [embedding2])[0][0]
+            # Encode both texts in one call
+            embeddings = self.encode_many([text1, text2])
             
-            return float(similarity)
+            # Embeddings are unit length, so cosine similarity is a plain dot product
+            return float(np.dot(embeddings[0], embeddings[1]))
         except Exception as e:
-            logger.error(f"Error calculating semantic similarity: {str(e)}")
+            logger.error("Error calculating semantic similarity: %s", e)
             return 0.0
 
     def analyze_query(self, query: str, context: Optional[Dict] = None) -> Dict[str, Any]:
@@ -196,16 +431,68 @@ class NLUModule:
         try:
             # Preprocess the query
             processed_query = self.preprocess_text(query)
-            
-            # Extract entities
-            entities = self.extract_entities(processed_query)
+        except Exception as e:
+            return self._analysis_error(query, e)
+        
+        # Identical processed text always yields the same analysis
+        cached = self._cached_analysis(query, processed_query, context)
+        if cached is not None:
+            return cached
+        
+        query_embedding = self._embed_for_analysis([processed_query])[0]
+        return self._analyze_processed(query, processed_query, query_embedding, context)
+
+    def analyze_queries_batch(self, queries: List[str], contexts: Optional[List[Optional[Dict]]] = None) -> List[Dict[str, Any]]:
+        """Analyze several queries and encode all of them with a single batched model call."""
+        contexts = contexts or [None] * len(queries)
+        analyses = [None] * len(queries)
+        
+        processed = {}
+        for i, query in enumerate(queries):
+            try:
+                processed_query = self.preprocess_text(query)
+            except Exception as e:
+                analyses[i] = self._analysis_error(query, e)
+                continue
+            analyses[i] = self._cached_analysis(query, processed_query, contexts[i])
+            if analyses[i] is None:
+                processed[i] = processed_query
+        
+        embeddings = self._embed_for_analysis(list(processed.values()))
+        for (i, processed_query), embedding in zip(processed.items(), embeddings):
+            analyses[i] = self._analyze_processed(queries[i], processed_query, embedding, contexts[i])
+        
+        return analyses
+
+    def _embed_for_analysis(self, texts: List[str]) -> List[Optional[np.ndarray]]:
+        """Embed processed queries in one call; analysis still proceeds without them on failure."""
+        try:
+            return list(self.encode_many(texts))
+        except Exception as e:
+            logger.error("Error generating query embeddings: %s", e)
+            return [None] * len(texts)
+
+    def _analyze_processed(self, query: str, processed_query: str, query_embedding: Optional[np.ndarray],
+                           context: Optional[Dict]) -> Dict[str, Any]:
+        """Build the analysis for a preprocessed query, reusing entities from a near-identical earlier query."""
+        try:
+            # Extract entities, or take them from a cached paraphrase
+            entities = (
+                self._semantic_lookup(query_embedding, processed_query) if query_embedding is not None else None
+            )
+            if entities is None:
+                entities = self.extract_entities(processed_query)
+                if query_embedding is not None:
+                    self._semantic_store(query_embedding, entities)
+            else:
+                entities = list(entities)
             
             # Detect question type and intent
             question_type = self.detect_question_type(processed_query)
             intent = self.detect_intent(processed_query)
             
             # Check if it's a follow-up question
-            is_followup = self.is_followup_question(processed_query, context or {})
+            is_followup = bool(context) and self.is_followup_question(processed_query, context)
             
             # Prepare the analysis result
             analysis = {
@@ -218,40 +505,210 @@ class NLUModule:
                 'context_used': bool(context)
             }
             
+            # Attach the embedding so callers can skip encoding the query again
+            if query_embedding is not None:
+                analysis['query_embedding'] = query_embedding
+            
+            self._remember_analysis(processed_query, analysis)
             return analysis
             
         except Exception as e:
-            logger.error(f"Error analyzing query: {str(e)}")
-            return {
-                'error': str(e),
-                'original_query': query
-            }
+            return self._analysis_error(query, e)
+
+    def _cached_analysis(self, query: str, processed_query: str, context: Optional[Dict]) -> Optional[Dict[str, Any]]:
+        """Return a copy of the cached analysis for this processed text, patched for the current call."""
+        with self._analysis_cache_lock:
+            cached = self._analysis_cache.get(processed_query)
+            if cached is None:
+                return None
+            self._analysis_cache.move_to_end(processed_query)
+        
+        analysis = dict(cached)
+        analysis['entities'] = list(cached['entities'])
+        analysis['original_query'] = query
+        analysis['context_used'] = bool(context)
+        # Follow-up detection depends on the context, not just the text
+        analysis['is_followup'] = bool(context) and self.is_followup_question(processed_query, context)
+        return analysis
+
+    def _remember_analysis(self, processed_query: str, analysis: Dict[str, Any]):
+        """Store an analysis for exact repeats of the processed text, evicting the oldest entry."""
+        entry = dict(analysis)
+        entry['entities'] = list(analysis['entities'])
+        with self._analysis_cache_lock:
+            self._analysis_cache[processed_query] = entry
+            self._analysis_cache.move_to_end(processed_query)
+            while len(self._analysis_cache) > ANALYSIS_CACHE_SIZE:
+                self._analysis_cache.popitem(last=False)
+
+    def _analysis_error(self, query: str, error: Exception) -> Dict[str, Any]:
+        """Log an analysis failure and return the error result."""
+        logger.error("Error analyzing query: %s", error)
+        return {
+            'error': str(error),
+            'original_query': query
+        }
+
+    def _semantic_lookup(self, embedding: np.ndarray, processed_query: str) -> Optional[Tuple[str, ...]]:
+        """Return the entities of the most similar cached query if it clears the threshold."""
+        with self._sem_cache_lock:
+            if not self._sem_cache_size:
+                return None
+            similarities = self._sem_cache_vecs[:self._sem_cache_size] @ embedding
+            best = int(np.argmax(similarities))
+            if similarities[best] < SEMANTIC_CACHE_THRESHOLD:
+                return None
+            entities = self._sem_cache_vals[best]
+            # Paraphrases can name different places ("Tech Park" / "Java Park"), so every cached
+            # entity must appear in this query as a whole run of tokens
+            query_tokens = f" {' '.join(_TOKEN_RE.findall(processed_query))} "
+            if not all(f' {entity} ' in query_tokens for entity in entities):
+                return None
+            self._sem_cache_clock += 1
+            self._sem_cache_used[best] = self._sem_cache_clock
+            return entities
+
+    def _semantic_store(self, embedding: np.ndarray, entities: List[str]):
+        """Remember a query's entities, replacing the least recently used entry when full."""
+        with self._sem_cache_lock:
+            if self._sem_cache_size < SEMANTIC_CACHE_SIZE:
+                slot = self._sem_cache_size
+                self._sem_cache_size += 1
+            else:
+                slot = int(np.argmin(self._sem_cache_used))
+            self._sem_cache_vecs[slot] = embedding
+            self._sem_cache_vals[slot] = tuple(entities)
+            self._sem_cache_clock += 1
+            self._sem_cache_used[slot] = self._sem_cache_clock
+
+    def encode_many(self, texts: List[str]) -> np.ndarray:
+        """Encode texts to unit-length vectors, serving repeats from the cache and batching the rest."""
+        with self._emb_cache_lock:
+            cached = {}
+            for text in texts:
+                if text not in cached and text in self._emb_cache:
+                    self._emb_cache.move_to_end(text)
+                    cached[text] = self._emb_cache[text]
+        
+        # Deduplicate while keeping order so each new text is encoded once
+        missing = [text for text in dict.fromkeys(texts) if text not in cached]
+        if missing:
+            embeddings = self._encode_bucketed(missing)
+            for text, embedding in zip(missing, embeddings):
+                cached[text] = embedding
+            self._store_embeddings(zip(missing, embeddings))
+        
+        if not texts:
+            return np.zeros((0, EMBEDDING_DIM), dtype=np.float32)
+        return np.stack([cached[text] for text in texts])
+
+    def _store_embeddings(self, items):
+        """Add (text, embedding) pairs to the LRU as read-only arrays so they can be handed out without copies."""
+        with self._emb_cache_lock:
+            for text, embedding in items:
+                embedding.flags.writeable = False
+                self._emb_cache[text] = embedding
+            while len(self._emb_cache) > EMBEDDING_CACHE_SIZE:
+                self._emb_cache.popitem(last=False)
+
+    def _encode_bucketed(self, texts: List[str]) -> np.ndarray:
+        """Encode texts in length buckets so each batch is padded only to similar lengths."""
+        if len(texts) == 1:
+            buckets = [np.array([0])]
+        else:
+            lengths = self._token_lengths(texts)
+            order = np.argsort(lengths, kind='stable')
+            bucket_ids = np.searchsorted(LENGTH_BUCKETS, lengths[order])
+            buckets = [order[bucket_ids == bucket] for bucket in np.unique(bucket_ids)]
+        
+        embeddings = np.empty((len(texts), EMBEDDING_DIM), dtype=np.float32)
+        for indices in buckets:
+            # FP16 models return half-precision arrays; the assignment keeps everything float32
+            embeddings[indices] = self.model.encode(
+                [texts[i] for i in indices],
+                batch_size=32, convert_to_numpy=True, normalize_embeddings=True
+            )
+        return embeddings
+
+    def _token_lengths(self, texts: List[str]) -> np.ndarray:
+        """Token count of each text, without special tokens; word counts if there is no tokenizer."""
+        tokenizer = getattr(self.model, 'tokenizer', None)
+        if tokenizer is None:
+            return np.array([len(text.split()) for text in texts])
+        return np.array([len(ids) for ids in tokenizer(texts, add_special_tokens=False)['input_ids']])
 
     def get_query_embedding(self, text: str) -> np.ndarray:
         """Get the embedding vector for a text query."""
         try:
-            return self.model.encode([text])[0]
+            with self._emb_cache_lock:
+                embedding = self._emb_cache.get(text)
+                if embedding is not None:
+                    self._emb_cache.move_to_end(text)
+            if embedding is None:
+                # encode_many caches the result, so the next call takes the fast path above
+                embedding = self._embedding_batcher.submit(text).result()
+            return embedding
         except Exception as e:
-            logger.error(f"Error generating embedding: {str(e)}")
-            return np.zeros(384)  # Default embedding size for all-MiniLM-L6-v2
+            logger.error("Error generating embedding: %s", e)
+            return np.zeros(EMBEDDING_DIM, dtype=np.float32)  # Default embedding size for all-MiniLM-L6-v2
+
+    def index_candidates(self, candidates: List[str]):
+        """Encode a fixed candidate corpus once so find_best_matches can reuse it."""
+        texts = list(candidates)
+        # Bypass the LRU so a large corpus does not evict recent queries
+        if texts:
+            matrix = np.ascontiguousarray(self._encode_bucketed(texts), dtype=np.float32)
+        else:
+            matrix = np.zeros((0, EMBEDDING_DIM), dtype=np.float32)
+        
+        faiss_index = None
+        if len(texts) > FAISS_MIN_CANDIDATES:
+            try:
+                import faiss
+                # Half-precision storage halves the memory scanned per query; FAISS does the
+                # fp16 -> fp32 conversion in SIMD, unlike NumPy's slow float16 matmul
+                faiss_index = faiss.IndexScalarQuantizer(
+                    EMBEDDING_DIM, faiss.ScalarQuantizer.QT_fp16, faiss.METRIC_INNER_PRODUCT
+                )
+                faiss_index.train(matrix)
+                faiss_index.add(matrix)
+            except ImportError:
+                pass  # FAISS is optional; the NumPy matrix product handles any size
+        
+        # Publish in one assignment so concurrent searches see a consistent index
+        self._candidate_index = (texts, matrix, faiss_index)
 
-    def find_best_matches(self, query: str, candidates: List[str], top_k: int = 3) -> List[Tuple[str, float]]:
-        """Find the best matching candidates for a query."""
+    def find_best_matches(self, query: str, candidates: Optional[List[str]] = None, top_k: int = 3) -> List[Tuple[str, float]]:
+        """Find the best matching candidates for a query, using the indexed corpus when none are given."""
         try:
-            # Get query embedding
-            query_embedding = self.get_query_embedding(query)
+            if candidates is None:
+                return self._search_index(query, top_k)
             
-            # Get embeddings for all candidates
-            candidate_embeddings = self.model.encode(candidates)
+            # Get query and candidate embeddings in one batch; repeated candidates come from the cache
+            embeddings = self.encode_many([query] + list(candidates))
+            query_embedding = embeddings[0]
+            candidate_embeddings = np.ascontiguousarray(embeddings[1:], dtype=np.float32)
             
-            # Calculate similarities
-            similarities = cosine_similarity([query_embedding], candidate_embeddings)[0]
+            # Calculate similarities; embeddings are unit length so this is cosine similarity
+            similarities = candidate_embeddings @ query_embedding
             
-            # Get top-k matches
-            top_indices = similarities.argsort()[-top_k:][::-1]
-            
-            return [(candidates[i], similarities[i]) for i in top_indices]
+            top_indices = top_k_indices(similarities, top_k)
+            return [(candidates[i], float(similarities[i])) for i in top_indices]
             
         except Exception as e:
-            logger.error(f"Error finding best matches: {str(e)}")
-            return [] 
\ No newline at end of file
+            logger.error("Error finding best matches: %s", e)
+            return []
+
+    def _search_index(self, query: str, top_k: int) -> List[Tuple[str, float]]:
+        """Rank the corpus stored by index_candidates against the query."""
+        if self._candidate_index is None:
+            raise ValueError("No candidates given and index_candidates has not been called")
+        texts, matrix, faiss_index = self._candidate_index
+        query_embedding = self.encode_many([query])[0]
+        
+        if faiss_index is not None:
+            scores, indices = faiss_index.search(query_embedding[None, :], min(top_k, len(texts)))
+            return [(texts[i], float(score)) for score, i in zip(scores[0], indices[0]) if i >= 0]
+        
+        similarities = matrix @ query_embedding
+        return [(texts[i], float(similarities[i])) for i in top_k_indices(similarities, top_k)]
@@ -1,12 +1,25 @@
-from typing import Dict, Any, Optional, List, Tuple
+from typing import Dict, Any, FrozenSet, Iterator, NamedTuple, Optional, List, Tuple, Union
+from collections import OrderedDict, defaultdict, deque
+from copy import deepcopy
 from knowledge_graph import SRMKnowledgeGraph
 from text_processor import TextProcessor, QuestionType
 from admission_handler import AdmissionHandler
-from datetime import datetime
-from flask import Flask, request, jsonify
+from nlu_module import NLUModule
+from log_queue import start_queue_logging
+from request_batcher import RequestBatcher
+from flask import Flask, Response, request, jsonify, stream_with_context
 from semantic_search import SemanticSearchEngine
+import json
 import logging
-import traceback
+import re
+import threading
+import time
+
+# google-re2 is optional; its RE2::Set matches every suggestion keyword group in one automaton pass
+try:
+    import re2
+except ImportError:
+    re2 = None
 
 app = Flask(__name__)
 
@@ -15,79 +28,312 @@ logging.basicConfig(
     level=logging.INFO,
     format='%(asctime)s - %(name)s - %(levelname)s - %(message)s'
 )
+# Records are written out by a background thread instead of the request thread
+start_queue_logging()
 logger = logging.getLogger(__name__)
 
+# Maximum number of distinct normalized queries whose responses are kept
+QUERY_CACHE_SIZE = 1024
+# Number of recent turns kept in the conversation history
+HISTORY_SIZE = 100
+
+# Keyword tables, built once. Whole-word checks run against the query's token set; the
+# patterns keep the substring semantics of the original checks
+_WORD_RE = re.compile(r'\w+')
+_PRONOUNS = frozenset({'it', 'this', 'that', 'these', 'those', 'they', 'there'})
+_REFERENCE_WORDS = frozenset({'same', 'this', 'that', 'it'})
+_ADMISSION_KEYWORDS = frozenset({
+    'admission', 'apply', 'application', 'enroll', 'join', 'entrance', 'exam', 'srmjeee'
+})
+_NAVIGATION_RE = re.compile(r'reach|get to|direction')
+_APPLY_RE = re.compile(r'admission|apply|join')
+_CAMPUS_TRANSFER_RE = re.compile(r'change campus|campus transfer')
+
+# Entity types each handler looks entities up as
+_FACTUAL_TYPES = ('campus', 'location', 'program', 'facility')
+_COMPARABLE_TYPES = ('campus', 'program', 'facility')
+# Relationships compared by default when the question names no aspects
+_DEFAULT_COMPARISON_RELATIONS = {
+    'campus': ('offers',),
+    'program': ('has_degree',)
+}
+# Graph types a location lookup tries for each TextProcessor entity type; facilities live under 'location'
+_LOCATION_SHARDS = {
+    'campus': ('campus',),
+    'facility': ('location',)
+}
+
+# Keyword groups find_similar_questions dispatches on, matched as substrings like the original checks
+_SUGGESTION_KEYWORDS = (
+    ('where', r'where'),
+    ('srm', r'srm'),
+    ('campus_facility', r'tech park|library|hostel'),
+    ('how', r'how'),
+    ('apply', r'admission|apply|join'),
+    ('reach', r'reach'),
+    ('program', r'program|course|degree'),
+    ('amenity', r'facility|amenity|infrastructure'),
+)
+_SUGGESTION_KEYWORD_NAMES = tuple(name for name, _ in _SUGGESTION_KEYWORDS)
+if re2 is not None:
+    _SUGGESTION_KEYWORD_SET = re2.Set.SearchSet(re2.Options())
+    for _, _pattern in _SUGGESTION_KEYWORDS:
+        _SUGGESTION_KEYWORD_SET.Add(_pattern)
+    _SUGGESTION_KEYWORD_SET.Compile()
+else:
+    # re has no pattern set; one optional lookahead per group still finds them all in a single match
+    _SUGGESTION_KEYWORD_RE = re.compile(
+        ''.join(f'(?=(?:.*?(?P<{name}>{pattern}))?)' for name, pattern in _SUGGESTION_KEYWORDS),
+        re.DOTALL
+    )
+
+def _suggestion_keywords(query: str) -> FrozenSet[str]:
+    """Return the names of every suggestion keyword group found in the lowercased query."""
+    if re2 is not None:
+        # Match returns None rather than an empty list when nothing matches
+        return frozenset(_SUGGESTION_KEYWORD_NAMES[i] for i in _SUGGESTION_KEYWORD_SET.Match(query) or ())
+    groups = _SUGGESTION_KEYWORD_RE.match(query).groupdict()
+    return frozenset(name for name, hit in groups.items() if hit is not None)
+
+# Suggestion templates; each holds SUGGESTION_COUNT distinct questions, so the first match is the answer
+_WHERE_SRM_SUGGESTIONS = (
+    "What are the different SRM campuses?",
+    "Where is SRM Kattankulathur campus located?",
+    "How to reach SRM main campus?"
+)
+_WHERE_FACILITY_SUGGESTIONS = (
+    "What facilities are available in Tech Park?",
+    "Where is the Central Library located?",
+    "What are the hostel facilities?"
+)
+_HOW_ADMISSION_SUGGESTIONS = (
+    "How to apply for admission at SRM?",
+    "What are the admission requirements?",
+    "How to apply for international admission?"
+)
+_HOW_REACH_SUGGESTIONS = (
+    "How to reach SRM from Chennai airport?",
+    "What transportation facilities are available?",
+    "Is there a college bus service?"
+)
+_PROGRAM_SUGGESTIONS = (
+    "What programs are offered at SRM?",
+    "Which engineering branches are available?",
+    "What are the postgraduate programs?"
+)
+_FACILITY_SUGGESTIONS = (
+    "What facilities are available at SRM?",
+    "What sports facilities are available?",
+    "Tell me about the hostel facilities"
+)
+# Every question find_similar_questions can suggest; ranked by similarity when no keyword template fits
+SUGGESTED_QUESTIONS = (
+    _WHERE_SRM_SUGGESTIONS + _WHERE_FACILITY_SUGGESTIONS + _HOW_ADMISSION_SUGGESTIONS
+    + _HOW_REACH_SUGGESTIONS + _PROGRAM_SUGGESTIONS + _FACILITY_SUGGESTIONS
+)
+SUGGESTION_COUNT = 3
+# Cosine similarity a suggestion needs to be offered at all
+SUGGESTION_MIN_SIMILARITY = 0.5
+
+# Invariant answers and procedure steps, built once instead of on every call
+_UNKNOWN_ANSWER = "I'm sorry, I don't understand that type of question yet."
+_FALLBACK_ANSWER = (
+    "I apologize, but I couldn't find specific information about that. "
+    "Could you please:\n"
+    "1. Rephrase your question\n"
+    "2. Be more specific\n"
+    "3. Ask about a different topic like campus locations, programs, or facilities?"
+)
+_ADMISSION_STEPS = (
+    "Visit the official SRM website (www.srmist.edu.in)",
+    "Click on 'Admissions' section",
+    "Choose your preferred program",
+    "Fill out the online application form",
+    "Pay the application fee",
+    "Submit required documents",
+    "Wait for the entrance exam date",
+    "Appear for counseling if selected"
+)
+_INTERNATIONAL_ADMISSION_INFO = (
+    "For international admissions, additional documents required:\n"
+    "- Passport copy\n"
+    "- Previous academic records\n"
+    "- English proficiency test scores"
+)
+_TRANSFER_ADMISSION_INFO = (
+    "For transfer admissions:\n"
+    "- Submit current institution transcripts\n"
+    "- Obtain No Objection Certificate\n"
+    "- Complete credit transfer evaluation"
+)
+_LIBRARY_STEPS = (
+    "Visit the library with your student ID",
+    "Register at the front desk",
+    "Get your library card",
+    "Follow borrowing guidelines",
+    "Return books on time"
+)
+_CAMPUS_TRANSFER_STEPS = (
+    "Submit application to current campus office",
+    "Obtain No Objection Certificate (NOC)",
+    "Apply to target campus",
+    "Wait for approval from both campuses",
+    "Complete transfer formalities"
+)
+_CAMPUS_TRANSFER_INFO = "Contact: transfer.office@srmist.edu.in"
+_HOSTEL_STEPS = (
+    "Submit hostel application",
+    "Pay hostel fees",
+    "Complete room allocation process",
+    "Collect room keys",
+    "Complete check-in formalities"
+)
+
+# The NLU module holds the encoder, an embedding batcher thread and the semantic cache, so
+# every session shares one, created with its suggestion index on first use
+_suggestion_nlu: Optional[NLUModule] = None
+_suggestion_nlu_lock = threading.Lock()
+
+def get_suggestion_nlu() -> NLUModule:
+    """Return the shared NLU module with SUGGESTED_QUESTIONS indexed, creating it on the first call."""
+    global _suggestion_nlu
+    if _suggestion_nlu is None:
+        with _suggestion_nlu_lock:
+            if _suggestion_nlu is None:
+                nlu = NLUModule()
+                nlu.index_candidates(SUGGESTED_QUESTIONS)
+                _suggestion_nlu = nlu
+    return _suggestion_nlu
+
+class _CachedQuery(NamedTuple):
+    """A processed query's response and the context updates it made."""
+    response: Dict[str, Any]
+    question_type: QuestionType
+    entities: List[str]
+    follow_up_updates: Dict[str, Any]
+
 class ORBAI:
+    """One conversation with ORB AI; the context is per user, so keep an instance per session, never a shared one."""
+
     def __init__(self):
         self.knowledge_graph = SRMKnowledgeGraph()
         self.text_processor = TextProcessor()
         self.admission_handler = AdmissionHandler()
         
+        # Shared by every session; the suggestion bank is embedded once per process
+        self.nlu = get_suggestion_nlu()
+        
         # Enhanced conversation context
         self.context = {
             'last_question_type': None,
             'last_entities': None,
             'current_topic': None,
-            'conversation_history': [],
+            'conversation_history': deque(maxlen=HISTORY_SIZE),
             'referenced_entities': set(),
             'follow_up_context': {},
             'clarification_needed': False
         }
+        
+        # LRU of (graph version, normalized query) -> processed result
+        self._query_cache: 'OrderedDict[Tuple[int, str], _CachedQuery]' = OrderedDict()
+        
+        # Question type -> handler; every handler takes (entities, context)
+        self._handlers = {
+            QuestionType.GREETING: self._handle_greeting,
+            QuestionType.LOCATION: self._handle_location_query,
+            QuestionType.FACTUAL: self._handle_factual_query,
+            QuestionType.PROCEDURAL: self._handle_procedural_query,
+            QuestionType.COMPARATIVE: self._handle_comparative_query
+        }
     
     def process_query(self, query: str) -> Dict[str, Any]:
         """Process a user query and return a formatted response."""
-        # Store the query in conversation history
+        # Store the query in conversation history; epoch seconds, formatted only if someone reads them
         self.context['conversation_history'].append({
             'query': query,
-            'timestamp': datetime.now().isoformat()
+            'timestamp': time.time()
         })
         
+        # Lowercase and tokenize once; the keyword-matching helpers below take these
+        query_lower = query.lower()
+        query_tokens = frozenset(_WORD_RE.findall(query_lower))
+        
+        # Only context-free answers are cached (see below), so a hit depends on the query text and graph alone
+        cache_key = (self.knowledge_graph.version, query_lower.strip())
+        cached = self._query_cache.get(cache_key)
+        if cached is not None:
+            self._query_cache.move_to_end(cache_key)
+            return self._replay_cached_query(cached)
+        follow_up_before = dict(self.context['follow_up_context'])
+        
         # Classify the question and extract entities
         classification = self.text_processor.classify_question(query)
         question_type = classification['type']
         entities = classification['entities']
-        query_context = classification['context']
+        # Entity type hints ride along with the query context so handlers can pick a graph shard
+        query_context = dict(classification['context'], entity_types=classification['entity_types'])
         
         # Update conversation context
         self.context['last_question_type'] = question_type
         self.context['last_entities'] = entities
         
         # Handle follow-up questions
-        if self._is_follow_up_question(query, classification):
-            entities = self._resolve_references(entities, query)
+        is_follow_up = self._is_follow_up_question(query_tokens, classification)
+        if is_follow_up:
+            entities = self._resolve_references(entities, query_tokens)
             
         # Process based on question type
         response = self._process_by_type(question_type, entities, query_context)
         
         # If response is empty, try fallback strategies
         if not response or (not response.get('information') and not response.get('formatted_answer')):
-            response = self._handle_fallback(query, classification)
+            response = self._handle_fallback(query_lower, query_tokens, classification)
         
         # Update context with the response
         self.context['conversation_history'][-1]['response'] = response
         
+        # Follow-ups, the clarification fallback and the no-entity factual path read the conversation
+        # context, so only queries with their own entities and no pronouns are safe to replay
+        if not is_follow_up and classification['entities']:
+            follow_up_updates = {
+                key: value for key, value in self.context['follow_up_context'].items()
+                if key not in follow_up_before or follow_up_before[key] != value
+            }
+            self._query_cache[cache_key] = _CachedQuery(
+                deepcopy(response), question_type, list(classification['entities']), follow_up_updates
+            )
+            if len(self._query_cache) > QUERY_CACHE_SIZE:
+                self._query_cache.popitem(last=False)
+        
         return response
     
-    def _is_follow_up_question(self, query: str, classification: Dict[str, Any]) -> bool:
-        """Detect if the current query is a follow-up question."""
-        # Check for pronouns referring to previous entities
-        pronouns = ['it', 'this', 'that', 'these', 'those', 'they', 'there']
-        query_lower = query.lower()
+    def _replay_cached_query(self, cached: _CachedQuery) -> Dict[str, Any]:
+        """Apply a cached query's context updates and return a fresh copy of its response."""
+        self.context['last_question_type'] = cached.question_type
+        self.context['last_entities'] = list(cached.entities)
+        self.context['follow_up_context'].update(cached.follow_up_updates)
         
-        has_pronouns = any(pronoun in query_lower.split() for pronoun in pronouns)
+        response = deepcopy(cached.response)
+        self.context['conversation_history'][-1]['response'] = response
+        return response
+    
+    def _is_follow_up_question(self, query_tokens: FrozenSet[str], classification: Dict[str, Any]) -> bool:
+        """Detect if the current query, given as its lowercased word set, is a follow-up question."""
+        # Check for pronouns referring to previous entities
+        has_pronouns = not _PRONOUNS.isdisjoint(query_tokens)
         has_no_entities = not classification['entities']
         has_previous_context = bool(self.context['last_entities'])
         
         return has_pronouns or (has_no_entities and has_previous_context)
     
-    def _resolve_references(self, current_entities: List[str], query: str) -> List[str]:
-        """Resolve entity references using conversation context."""
+    def _resolve_references(self, current_entities: List[str], query_tokens: FrozenSet[str]) -> List[str]:
+        """Resolve entity references in the query's lowercased word set using conversation context."""
         resolved_entities = list(current_entities)
         
         # If no current entities but we have previous context
         if not current_entities and self.context['last_entities']:
             # Add relevant previous entities based on query type
-            if any(word in query.lower() for word in ['same', 'this', 'that', 'it']):
+            if not _REFERENCE_WORDS.isdisjoint(query_tokens):
                 resolved_entities.extend(self.context['last_entities'])
         
         # Add entities from follow-up context if relevant
@@ -96,7 +342,8 @@ class ORBAI:
                 self.context['follow_up_context']['relevant_entities']
             )
         
-        return list(set(resolved_entities))
+        # Deduplicate keeping order: current entities, then earlier ones, then follow-up context
+        return list(dict.fromkeys(resolved_entities))
     
     def _process_by_type(
         self, 
@@ -105,27 +352,28 @@ class ORBAI:
         context: Dict[str, Any]
     ) -> Dict[str, Any]:
         """Process the query based on its type and context."""
-        if question_type == QuestionType.GREETING:
-            return {
-                'type': 'greeting',
-                'formatted_answer': self.text_processor.format_response(question_type, {})
-            }
-        
-        if question_type == QuestionType.LOCATION:
-            return self._handle_location_query(entities, context)
-        
-        if question_type == QuestionType.FACTUAL:
-            return self._handle_factual_query(entities, context)
-        
-        if question_type == QuestionType.PROCEDURAL:
-            return self._handle_procedural_query(entities, context)
-        
-        if question_type == QuestionType.COMPARATIVE:
-            return self._handle_comparative_query(entities, context)
-        
+        return self._handlers.get(question_type, self._handle_unknown)(entities, context)
+    
+    def _handle_greeting(
+        self, 
+        entities: List[str], 
+        context: Dict[str, Any]
+    ) -> Dict[str, Any]:
+        """Answer a greeting with an overview of what can be asked."""
+        return {
+            'type': 'greeting',
+            'formatted_answer': self.text_processor.format_response(QuestionType.GREETING, {})
+        }
+    
+    def _handle_unknown(
+        self, 
+        entities: List[str], 
+        context: Dict[str, Any]
+    ) -> Dict[str, Any]:
+        """Respond to question types without a handler."""
         return {
             'type': 'unknown',
-            'formatted_answer': "I'm sorry, I don't understand that type of question yet."
+            'formatted_answer': _UNKNOWN_ANSWER
         }
     
     def _handle_location_query(
@@ -135,30 +383,36 @@ class ORBAI:
     ) -> Dict[str, Any]:
         """Handle location-based queries with enhanced context."""
         response_data = []
+        follow_up = self.context['follow_up_context']
+        entity_types = context.get('entity_types', {})
+        
+        # A typed entity only visits its own shard; untyped ones accept campuses and locations
+        by_shards = defaultdict(list)
+        for entity in dict.fromkeys(entities):
+            by_shards[_LOCATION_SHARDS.get(entity_types.get(entity), ('campus', 'location'))].append(entity)
+        
+        # Exact campus/location hits first; whatever is left goes to one batched text search
+        exact = {}
+        for shards, shard_entities in by_shards.items():
+            exact.update(self.knowledge_graph.query_multi(shard_entities, shards))
+        searches = self.knowledge_graph.search_by_text_many(
+            [entity for entity in entities if entity not in exact]
+        )
         
         for entity in entities:
-            # Check campuses first
-            campus_info = self.knowledge_graph.query('campus', {'id': entity})
-            if campus_info:
-                response_data.extend(campus_info)
-                # Store for potential follow-up questions
-                self.context['follow_up_context']['campus'] = entity
-                continue
-            
-            # Check specific locations
-            location_info = self.knowledge_graph.query('location', {'id': entity})
-            if location_info:
-                response_data.extend(location_info)
+            if entity in exact:
                 # Store for potential follow-up questions
-                self.context['follow_up_context']['location'] = entity
+                context_key, results = exact[entity]
+                response_data.extend(results)
+                follow_up[context_key] = entity
                 continue
             
-            # Try text search if exact match not found
-            search_results = self.knowledge_graph.search_by_text(entity)
+            # Text search results when no exact match was found
+            search_results = searches[entity]
             if search_results:
                 response_data.extend(search_results)
                 # Store search terms for context
-                self.context['follow_up_context']['search_terms'] = entity
+                follow_up['search_terms'] = entity
         
         return {
             'type': 'location',
@@ -182,31 +436,36 @@ class ORBAI:
             entities = [context['location_reference']]
         
         if entities:
-            # Process each identified entity
+            # Try exact matches first, for every entity in one pass over the graph
+            hits = self.knowledge_graph.query_multi(entities, _FACTUAL_TYPES)
             for entity in entities:
-                # Try exact matches first
-                for entity_type in ['campus', 'location', 'program', 'facility']:
-                    results = self.knowledge_graph.query(entity_type, {'id': entity})
-                    if results:
-                        response_data[entity_type] = results
-                        # Store for follow-up questions
-                        self.context['follow_up_context'][entity_type] = entity
-                        break
-                
-                # If no exact matches, try text search
-                if entity not in str(response_data):
-                    search_results = self.knowledge_graph.search_by_text(entity)
-                    if search_results:
-                        for result in search_results:
-                            entity_type = result.get('type', 'unknown')
-                            if entity_type not in response_data:
-                                response_data[entity_type] = []
-                            response_data[entity_type].append(result)
+                if entity in hits:
+                    entity_type, results = hits[entity]
+                    response_data[entity_type] = results
+                    # Store for follow-up questions
+                    self.context['follow_up_context'][entity_type] = entity
+            
+            # If no exact matches, try text search; an empty entity would match every node
+            searches = self.knowledge_graph.search_by_text_many(
+                [entity for entity in entities if entity and entity not in hits]
+            )
+            added = {results[0]['id'] for _, results in hits.values()}
+            for search_results in searches.values():
+                for result in search_results:
+                    # Overlapping entities ("library", "central library") find the same nodes
+                    if result['id'] in added:
+                        continue
+                    added.add(result['id'])
+                    entity_type = result.get('type', 'unknown')
+                    if entity_type not in response_data:
+                        response_data[entity_type] = []
+                    response_data[entity_type].append(result)
         else:
             # Try to use context from previous queries
             if self.context['last_entities']:
+                searches = self.knowledge_graph.search_by_text_many(self.context['last_entities'])
                 for entity in self.context['last_entities']:
-                    results = self.knowledge_graph.search_by_text(entity)
+                    results = searches[entity]
                     if results:
                         response_data['related_info'] = results
         
@@ -228,17 +487,23 @@ class ORBAI:
         steps = []
         additional_info = None
         
+        entity_text = ' '.join(entities).lower()
+        
         # Check for navigation/direction queries
-        if any(word in ' '.join(entities).lower() for word in ['reach', 'get to', 'direction']):
+        if _NAVIGATION_RE.search(entity_text):
             steps, additional_info = self._get_navigation_steps(entities)
         
         # Check for admission-related queries
-        elif any(word in ' '.join(entities).lower() for word in ['admission', 'apply', 'join']):
-            steps, additional_info = self._get_admission_steps(entities, context)
+        elif _APPLY_RE.search(entity_text):
+            steps, additional_info = self._get_admission_steps(entities, context, entity_text)
+        
+        # Check for campus transfers
+        elif _CAMPUS_TRANSFER_RE.search(entity_text):
+            steps, additional_info = list(_CAMPUS_TRANSFER_STEPS), _CAMPUS_TRANSFER_INFO
         
         # Handle other types of procedures
         else:
-            steps, additional_info = self._get_general_procedure(entities, context)
+            steps, additional_info = self._get_general_procedure(entities, context, entity_text)
         
         response = {
             'type': 'procedural',
@@ -257,36 +522,36 @@ class ORBAI:
     
     def _handle_comparative_query(
         self, 
-        entities: List[str], 
+        entities: Union[List[str], Dict[str, List[str]]], 
         context: Dict[str, Any]
     ) -> Dict[str, Any]:
         """Handle comparative queries with detailed analysis."""
         comparisons = {}
         comparison_aspects = context.get('comparison_aspects', [])
         
-        # If no specific aspects mentioned, use default comparison points
-        if not comparison_aspects:
-            comparison_aspects = ['location', 'facilities', 'programs']
+        # Entities may also arrive grouped by type, e.g. {'campuses': [...], 'programs': [...]}
+        if isinstance(entities, dict):
+            entities = [entity for group in entities.values() for entity in group]
         
+        # Find information about every entity in one pass over the graph
+        hits = self.knowledge_graph.query_multi(entities, _COMPARABLE_TYPES)
         for entity in entities:
             entity_info = None
             
-            # Try to find information about the entity
-            for entity_type in ['campus', 'program', 'facility']:
-                results = self.knowledge_graph.query(entity_type, {'id': entity})
-                if results:
-                    entity_info = results[0]
-                    # Get related information based on comparison aspects
-                    for aspect in comparison_aspects:
-                        related = self.knowledge_graph.get_related_entities(
-                            entity,
-                            aspect
-                        )
-                        if related:
-                            if 'related' not in entity_info:
-                                entity_info['related'] = {}
-                            entity_info['related'][aspect] = related
-                    break
+            if entity in hits:
+                entity_type, results = hits[entity]
+                entity_info = results[0]
+                # Get related information based on comparison aspects, or the type's usual ones:
+                # programs offered for a campus, degrees for a program
+                for aspect in comparison_aspects or _DEFAULT_COMPARISON_RELATIONS.get(entity_type, ()):
+                    related = self.knowledge_graph.get_related_entities(
+                        entity_info['id'],
+                        aspect
+                    )
+                    if related:
+                        if 'related' not in entity_info:
+                            entity_info['related'] = {}
+                        entity_info['related'][aspect] = related
             
             if entity_info:
                 comparisons[entity] = entity_info
@@ -302,12 +567,13 @@ class ORBAI:
     
     def _handle_fallback(
         self, 
-        query: str, 
+        query_lower: str, 
+        query_tokens: FrozenSet[str], 
         classification: Dict[str, Any]
     ) -> Dict[str, Any]:
-        """Handle cases where no direct answer is found."""
+        """Handle cases where no direct answer is found for the lowercased query."""
         # Try to find similar questions
-        similar_questions = self.find_similar_questions(query)
+        similar_questions = self.find_similar_questions(query_lower)
         
         if similar_questions:
             return {
@@ -319,7 +585,7 @@ class ORBAI:
             }
         
         # If this is a follow-up question, try to use context
-        if self._is_follow_up_question(query, classification):
+        if self._is_follow_up_question(query_tokens, classification):
             if self.context['last_entities']:
                 return {
                     'type': 'clarification',
@@ -333,13 +599,7 @@ class ORBAI:
         # General fallback response
         return {
             'type': 'fallback',
-            'formatted_answer': (
-                "I apologize, but I couldn't find specific information about that. "
-                "Could you please:\n"
-                "1. Rephrase your question\n"
-                "2. Be more specific\n"
-                "3. Ask about a different topic like campus locations, programs, or facilities?"
-            )
+            'formatted_answer': _FALLBACK_ANSWER
         }
     
     def _get_navigation_steps(
@@ -350,18 +610,10 @@ class ORBAI:
         steps = []
         additional_info = None
         
+        # Campuses and other locations, looked up by id in one pass
+        hits = self.knowledge_graph.query_multi(entities, ('campus', 'location'))
         for entity in entities:
-            location_info = None
-            
-            # Check campuses first
-            campus_results = self.knowledge_graph.query('campus', {'id': entity})
-            if campus_results:
-                location_info = campus_results[0]
-            else:
-                # Check other locations
-                location_results = self.knowledge_graph.query('location', {'id': entity})
-                if location_results:
-                    location_info = location_results[0]
+            location_info = hits[entity][1][0] if entity in hits else None
             
             if location_info:
                 steps = [
@@ -381,346 +633,167 @@ class ORBAI:
     def _get_admission_steps(
         self, 
         entities: List[str],
-        context: Dict[str, Any]
+        context: Dict[str, Any],
+        entity_text: str
     ) -> Tuple[List[str], Optional[str]]:
-        """Get admission procedure steps."""
-        steps = [
-            "Visit the official SRM website (www.srmist.edu.in)",
-            "Click on 'Admissions' section",
-            "Choose your preferred program",
-            "Fill out the online application form",
-            "Pay the application fee",
-            "Submit required documents",
-            "Wait for the entrance exam date",
-            "Appear for counseling if selected"
-        ]
+        """Get admission procedure steps; entity_text is the entities joined and lowercased."""
+        # Copied so the response never shares the module-level steps
+        steps = list(_ADMISSION_STEPS)
         
         additional_info = None
         
         # Check for specific program or type of admission
-        if any('international' in entity.lower() for entity in entities):
-            additional_info = (
-                "For international admissions, additional documents required:\n"
-                "- Passport copy\n"
-                "- Previous academic records\n"
-                "- English proficiency test scores"
-            )
-        elif any('transfer' in entity.lower() for entity in entities):
-            additional_info = (
-                "For transfer admissions:\n"
-                "- Submit current institution transcripts\n"
-                "- Obtain No Objection Certificate\n"
-                "- Complete credit transfer evaluation"
-            )
+        if 'international' in entity_text:
+            additional_info = _INTERNATIONAL_ADMISSION_INFO
+        elif 'transfer' in entity_text:
+            additional_info = _TRANSFER_ADMISSION_INFO
         
         return steps, additional_info
     
     def _get_general_procedure(
         self, 
         entities: List[str],
-        context: Dict[str, Any]
+        context: Dict[str, Any],
+        entity_text: str
     ) -> Tuple[List[str], Optional[str]]:
-        """Get steps for general procedures."""
+        """Get steps for general procedures; entity_text is the entities joined and lowercased."""
         steps = []
         additional_info = None
         
         # Handle common procedures
-        if any('library' in entity.lower() for entity in entities):
-            steps = [
-                "Visit the library with your student ID",
-                "Register at the front desk",
-                "Get your library card",
-                "Follow borrowing guidelines",
-                "Return books on time"
-            ]
+        if 'library' in entity_text:
+            steps = list(_LIBRARY_STEPS)
             additional_info = "Library timings: 8:00 AM to 8:00 PM"
         
-        elif any('hostel' in entity.lower() for entity in entities):
-            steps = [
-                "Submit hostel application",
-                "Pay hostel fees",
-                "Complete room allocation process",
-                "Collect room keys",
-                "Complete check-in formalities"
-            ]
+        elif 'hostel' in entity_text:
+            steps = list(_HOSTEL_STEPS)
             additional_info = "Contact hostel office for more details"
         
         return steps, additional_info
     
     def _is_admission_query(self, text: str) -> bool:
         """Check if the query is related to admissions."""
-        admission_keywords = [
-            "admission", "apply", "application", "enroll",
-            "join", "entrance", "exam", "srmjeee"
-        ]
-        return any(keyword in text for keyword in admission_keywords)
-    
-    def _handle_comparative_query(self, text: str, entities: Dict[str, list]) -> Dict[str, Any]:
-        """Handle comparative questions (e.g., comparing programs across campuses)."""
-        response = {"type": "comparative", "comparisons": []}
-        
-        # If comparing campuses
-        if entities['campuses']:
-            for campus in entities['campuses']:
-                campus_info = self.knowledge_graph.query(
-                    "campus",
-                    {"id": campus}
-                )
-                if campus_info:
-                    programs = self.knowledge_graph.get_related_entities(
-                        campus,
-                        "offers"
-                    )
-                    response["comparisons"].append({
-                        "campus": campus,
-                        "details": campus_info[0],
-                        "programs": programs
-                    })
-        
-        # If comparing programs
-        elif entities['programs']:
-            for program in entities['programs']:
-                program_info = self.knowledge_graph.query(
-                    "program",
-                    {"id": program}
-                )
-                if program_info:
-                    courses = self.knowledge_graph.get_related_entities(
-                        program,
-                        "includes"
-                    )
-                    response["comparisons"].append({
-                        "program": program,
-                        "details": program_info[0],
-                        "courses": courses
-                    })
-        
-        return response
-    
-    def _handle_procedural_query(self, text: str, entities: Dict[str, list]) -> Dict[str, Any]:
-        """Handle procedural questions (how-to guides, steps, etc.)."""
-        response = {"type": "procedural", "steps": []}
-        
-        # Example procedure for campus change
-        if "change campus" in text or "campus transfer" in text:
-            response["steps"] = [
-                "1. Submit application to current campus office",
-                "2. Obtain No Objection Certificate (NOC)",
-                "3. Apply to target campus",
-                "4. Wait for approval from both campuses",
-                "5. Complete transfer formalities"
-            ]
-            response["contact"] = "transfer.office@srmist.edu.in"
-        
-        # Add more procedural handlers as needed
-        
-        return response
-    
-    def _handle_factual_query(self, text: str, entities: Dict[str, list]) -> Dict[str, Any]:
-        """Handle factual questions (direct information queries)."""
-        response = {"type": "factual", "information": {}}
-        
-        # First try direct entity queries
-        for entity_type, entity_list in entities.items():
-            for entity in entity_list:
-                info = self.knowledge_graph.query(
-                    entity_type.rstrip('s'),  # Remove plural 's'
-                    {"id": entity}
-                )
-                if info:
-                    response["information"][entity] = info[0]
-        
-        # If no specific entities found, try text search
-        if not response["information"]:
-            results = self.knowledge_graph.search_by_text(text)
-            if results:
-                for result in results:
-                    entity_id = result.pop('id')
-                    response["information"][entity_id] = result
-                    
-                    # If it's a location, get its facilities
-                    if result.get('type') == 'location':
-                        facilities = self.knowledge_graph.get_related_entities(entity_id)
-                        if facilities:
-                            response["information"][entity_id]['facilities'] = facilities
-                    
-                    # If it's a campus, get its locations and facilities
-                    elif result.get('type') == 'campus':
-                        locations = self.knowledge_graph.get_related_entities(
-                            entity_id, 'has_location'
-                        )
-                        if locations:
-                            response["information"][entity_id]['locations'] = locations
-                        
-                        facilities = self.knowledge_graph.get_related_entities(
-                            entity_id, 'has_facility'
-                        )
-                        if facilities:
-                            response["information"][entity_id]['facilities'] = facilities
-        
-        # Format the response for better readability
-        if response["information"]:
-            formatted_response = self._format_response(response["information"])
-            response["formatted_answer"] = formatted_response
-        
-        return response
-    
-    def _format_response(self, information: Dict[str, Any]) -> str:
-        """Format the response information into a readable string."""
-        formatted = []
-        
-        for entity, details in information.items():
-            if details.get('type') == 'campus':
-                formatted.append(f"{entity} Campus:")
-                formatted.append(f"- Location: {details.get('location', 'N/A')}")
-                formatted.append(f"- Address: {details.get('address', 'N/A')}")
-                
-                if 'locations' in details:
-                    formatted.append("- Notable locations:")
-                    for loc in details['locations']:
-                        formatted.append(f"  * {loc['id']}: {loc.get('description', '')}")
-                
-                if 'facilities' in details:
-                    formatted.append("- Facilities available:")
-                    for facility in details['facilities']:
-                        if isinstance(facility.get('types', []), list):
-                            formatted.append(f"  * {facility['id']}: {', '.join(facility['types'])}")
-                        else:
-                            formatted.append(f"  * {facility['id']}")
-            
-            elif details.get('type') == 'location':
-                formatted.append(f"{entity}:")
-                formatted.append(f"- {details.get('description', '')}")
-                formatted.append(f"- Located in: {details.get('location', 'N/A')}")
-                
-                if 'facilities' in details:
-                    formatted.append("- Available facilities:")
-                    for facility in details['facilities']:
-                        formatted.append(f"  * {facility}")
-            
-            elif details.get('type') == 'program':
-                formatted.append(f"{entity} Program:")
-                if 'degrees' in details:
-                    formatted.append(f"- Degrees offered: {', '.join(details['degrees'])}")
-                if 'departments' in details:
-                    formatted.append("- Departments:")
-                    for dept in details['departments']:
-                        formatted.append(f"  * {dept}")
-        
-        return "\n".join(formatted)
+        return not _ADMISSION_KEYWORDS.isdisjoint(_WORD_RE.findall(text))
     
     def find_similar_questions(self, query: str) -> List[str]:
         """Find similar questions based on the query."""
-        suggestions = []
-        
         # Convert query to lowercase for matching
         query = query.lower()
         
-        # Common question patterns
-        if 'where' in query:
-            if 'srm' in query:
-                suggestions.extend([
-                    "What are the different SRM campuses?",
-                    "Where is SRM Kattankulathur campus located?",
-                    "How to reach SRM main campus?"
-                ])
-            if any(loc in query for loc in ['tech park', 'library', 'hostel']):
-                suggestions.extend([
-                    "What facilities are available in Tech Park?",
-                    "Where is the Central Library located?",
-                    "What are the hostel facilities?"
-                ])
-        
-        elif 'how' in query:
-            if any(word in query for word in ['admission', 'apply', 'join']):
-                suggestions.extend([
-                    "How to apply for admission at SRM?",
-                    "What are the admission requirements?",
-                    "How to apply for international admission?"
-                ])
-            if 'reach' in query:
-                suggestions.extend([
-                    "How to reach SRM from Chennai airport?",
-                    "What transportation facilities are available?",
-                    "Is there a college bus service?"
-                ])
-        
-        elif any(word in query for word in ['program', 'course', 'degree']):
-            suggestions.extend([
-                "What programs are offered at SRM?",
-                "Which engineering branches are available?",
-                "What are the postgraduate programs?"
-            ])
-        
-        elif any(word in query for word in ['facility', 'amenity', 'infrastructure']):
-            suggestions.extend([
-                "What facilities are available at SRM?",
-                "What sports facilities are available?",
-                "Tell me about the hostel facilities"
-            ])
-        
-        # Return unique suggestions, limited to top 3
-        return list(dict.fromkeys(suggestions))[:3]
+        # Every keyword group is found in one pass; the templates cascade over the result
+        keywords = _suggestion_keywords(query)
+        
+        # Common question patterns; a template already fills the quota, so later ones are never needed
+        if 'where' in keywords:
+            if 'srm' in keywords:
+                return list(_WHERE_SRM_SUGGESTIONS)
+            if 'campus_facility' in keywords:
+                return list(_WHERE_FACILITY_SUGGESTIONS)
+        
+        elif 'how' in keywords:
+            if 'apply' in keywords:
+                return list(_HOW_ADMISSION_SUGGESTIONS)
+            if 'reach' in keywords:
+                return list(_HOW_REACH_SUGGESTIONS)
+        
+        elif 'program' in keywords:
+            return list(_PROGRAM_SUGGESTIONS)
+        
+        elif 'amenity' in keywords:
+            return list(_FACILITY_SUGGESTIONS)
+        
+        # Nothing matched the keyword templates, so rank the whole question bank semantically
+        matches = self.nlu.find_best_matches(query, top_k=SUGGESTION_COUNT)
+        return [question for question, score in matches if score >= SUGGESTION_MIN_SIMILARITY]
 
-# Initialize the semantic search engine
-search_engine = SemanticSearchEngine()
+# The semantic search engine loads its model, so it is created on first use rather than at import
+_search_engine: Optional[SemanticSearchEngine] = None
+_search_engine_lock = threading.Lock()
 
-def format_response(response_data):
-    """Format the response based on its type."""
+def get_search_engine() -> SemanticSearchEngine:
+    """Return the shared semantic search engine, creating it on the first call."""
+    global _search_engine
+    if _search_engine is None:
+        with _search_engine_lock:
+            if _search_engine is None:
+                _search_engine = SemanticSearchEngine()
+    return _search_engine
+
+def search_batch(messages: List[str]) -> List[Dict[str, Any]]:
+    """Search several messages at once, sharing one embedding pass when the engine supports it."""
+    search_engine = get_search_engine()
+    batch_search = getattr(search_engine, 'search_batch', None)
+    if batch_search is not None:
+        return batch_search(messages)
+    return [search_engine.search(message) for message in messages]
+
+# Messages from concurrent requests arriving within 20ms are searched as one batch
+batcher = RequestBatcher(search_batch, max_batch_size=16, max_wait=0.02)
+REQUEST_TIMEOUT = 30
+# Longer messages are rejected before searching
+MAX_MESSAGE_LENGTH = 2048
+
+def iter_response_lines(response_data) -> Iterator[str]:
+    """Yield the formatted response text for a search result one line at a time."""
     response_type = response_data.get('type')
     
     if response_type == 'location':
-        return {
-            'response': (
-                f"{response_data['entity']} is located at {response_data['address']}. "
-                f"You can find it in {response_data['location']}.\n"
-                f"Here's a map link: {response_data['map_link']}"
-            ),
-            'confidence': response_data.get('confidence', 1.0)
-        }
+        yield (
+            f"{response_data['entity']} is located at {response_data['address']}. "
+            f"You can find it in {response_data['location']}."
+        )
+        yield f"Here's a map link: {response_data['map_link']}"
     
     elif response_type == 'description':
-        return {
-            'response': (
-                f"{response_data['entity']}: {response_data['description']}"
-            ),
-            'confidence': response_data.get('confidence', 1.0)
-        }
+        yield f"{response_data['entity']}: {response_data['description']}"
     
     elif response_type == 'facilities':
         facilities_list = ", ".join(response_data['facilities'])
-        return {
-            'response': (
-                f"{response_data['entity']} has the following facilities: {facilities_list}.\n"
-                f"{response_data['description']}"
-            ),
-            'confidence': response_data.get('confidence', 1.0)
-        }
+        yield f"{response_data['entity']} has the following facilities: {facilities_list}."
+        yield response_data['description']
     
     elif response_type == 'fallback':
-        suggestions = "\n".join([f"- {q}" for q in response_data.get('suggestions', [])])
-        return {
-            'response': (
-                f"{response_data['message']}\n\n"
-                f"You might want to try these questions instead:\n{suggestions}"
-            ),
-            'confidence': 0.0
-        }
+        yield response_data['message']
+        yield ""
+        yield "You might want to try these questions instead:"
+        suggestions = [f"- {q}" for q in response_data.get('suggestions', [])]
+        # An empty list still ends the text with a newline, as the joined form always did
+        yield from suggestions or [""]
     
     elif response_type == 'error':
-        return {
-            'response': response_data['message'],
-            'confidence': 0.0
-        }
+        yield response_data['message']
     
-    # Default full info response
-    info = response_data.get('info', {})
+    else:
+        # Default full info response
+        info = response_data.get('info', {})
+        yield f"Here's what I know about {info.get('id', 'this')}:"
+        details = [f"{k}: {v}" for k, v in info.items() if k != 'id']
+        yield from details or [""]
+
+def response_confidence(response_data) -> float:
+    """Return the confidence reported alongside a search result's formatted response."""
+    if response_data.get('type') in ('fallback', 'error'):
+        return 0.0
+    return response_data.get('confidence', 1.0)
+
+def format_response(response_data):
+    """Format the response based on its type."""
     return {
-        'response': f"Here's what I know about {info.get('id', 'this')}:\n" + 
-                   "\n".join([f"{k}: {v}" for k, v in info.items() if k != 'id']),
-        'confidence': response_data.get('confidence', 1.0)
+        'response': "\n".join(iter_response_lines(response_data)),
+        'confidence': response_confidence(response_data)
     }
 
+def stream_response(response_data) -> Iterator[str]:
+    """Yield a search result as NDJSON: one {"delta": line} per line, then {"done": true, "confidence": ...}."""
+    try:
+        for line in iter_response_lines(response_data):
+            yield json.dumps({'delta': line}) + '\n'
+        yield json.dumps({'done': True, 'confidence': response_confidence(response_data)}) + '\n'
+    except Exception as e:
+        # Headers are already sent, so the failure is reported in-band
+        logger.error("Error streaming response: %s", e, exc_info=True)
+        yield json.dumps({'done': True, 'error': 'Internal server error'}) + '\n'
+
 @app.route('/chat', methods=['POST'])
 def chat():
     try:
@@ -732,18 +805,31 @@ def chat():
             }), 400
 
         user_message = data['message']
-        logger.info(f"Received message: {user_message}")
+        # Empty, non-string and oversized messages are rejected before any search work
+        if not user_message or not isinstance(user_message, str) or len(user_message) > MAX_MESSAGE_LENGTH:
+            return jsonify({
+                'error': 'Invalid message',
+                'response': f"Please provide a non-empty message of at most {MAX_MESSAGE_LENGTH} characters."
+            }), 400
 
-        # Get response from semantic search engine
-        search_result = search_engine.search(user_message)
+        logger.info("Received message: %s", user_message)
+
+        # Get response from semantic search engine, as part of the next batch
+        search_result = batcher.submit(user_message).result(timeout=REQUEST_TIMEOUT)
+        
+        # Stream line by line unless the client asks for the single JSON body
+        if request.args.get('stream', 'true').lower() != 'false':
+            return Response(
+                stream_with_context(stream_response(search_result)),
+                mimetype='application/x-ndjson'
+            )
         formatted_response = format_response(search_result)
 
-        logger.info(f"Generated response: {formatted_response}")
+        logger.info("Generated response: %s", formatted_response)
         return jsonify(formatted_response)
 
     except Exception as e:
-        logger.error(f"Error processing request: {str(e)}")
-        logger.error(traceback.format_exc())
+        logger.error("Error processing request: %s", e, exc_info=True)
         return jsonify({
             'error': 'Internal server error',
             'response': "I'm sorry, but I encountered an error processing your request. Please try again."
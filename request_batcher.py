@@ -0,0 +1,127 @@
+from typing import Any, Callable, List, Tuple
+from concurrent.futures import Future
+import logging
+import os
+import queue
+import threading
+import time
+
+logger = logging.getLogger(__name__)
+
+# Batchers whose workers must be restarted in a forked child; one fork hook serves them all
+_live_batchers = set()
+_live_batchers_lock = threading.Lock()
+
+def _restart_after_fork():
+    """Threads do not survive fork(), so give every live batcher a new worker in the child."""
+    for batcher in _live_batchers:
+        batcher._start_worker()
+
+if hasattr(os, 'register_at_fork'):
+    os.register_at_fork(after_in_child=_restart_after_fork)
+
+class RequestBatcher:
+    """Coalesce items submitted from concurrent requests into batched calls."""
+
+    def __init__(
+        self,
+        process_batch: Callable[[List[Any]], List[Any]],
+        max_batch_size: int = 16,
+        max_wait: float = 0.02
+    ):
+        """
+        Start a background worker that feeds batches to process_batch.
+
+        Args:
+            process_batch: Callable taking a list of items and returning one result per item
+            max_batch_size: Largest number of items handed to process_batch at once
+            max_wait: Seconds to keep collecting items after the first one arrives
+        """
+        self.process_batch = process_batch
+        self.max_batch_size = max_batch_size
+        self.max_wait = max_wait
+        self._closed = False
+        self._start_worker()
+        # A preloaded server's workers are forked after this, so each needs its own thread
+        with _live_batchers_lock:
+            _live_batchers.add(self)
+
+    def _start_worker(self):
+        """Create a fresh queue, lock and the daemon thread that drains the queue."""
+        self._queue = queue.Queue()
+        # A lock held by a thread that did not survive fork() would never be released
+        self._submit_lock = threading.Lock()
+        self._worker = threading.Thread(target=self._run, daemon=True)
+        self._worker.start()
+
+    def submit(self, item: Any) -> Future:
+        """Queue an item and return a future resolved with its result."""
+        future = Future()
+        with self._submit_lock:
+            if self._closed:
+                raise RuntimeError("RequestBatcher is closed")
+            self._queue.put((item, future))
+        return future
+
+    def close(self):
+        """Stop the worker once the items already queued are processed; later submits raise."""
+        with self._submit_lock:
+            if self._closed:
+                return
+            self._closed = True
+            # None marks the end of the queue for the worker
+            self._queue.put(None)
+        with _live_batchers_lock:
+            _live_batchers.discard(self)
+        self._worker.join()
+
+    def _collect(self) -> Tuple[List[tuple], bool]:
+        """
+        Block for the first item, then gather more until the batch is full or the window closes.
+
+        Returns:
+            The batch and whether close() was called, in which case nothing follows it
+        """
+        entry = self._queue.get()
+        if entry is None:
+            return [], True
+        batch = [entry]
+        deadline = time.monotonic() + self.max_wait
+        while len(batch) < self.max_batch_size:
+            remaining = deadline - time.monotonic()
+            if remaining <= 0:
+                break
+            try:
+                entry = self._queue.get(timeout=remaining)
+            except queue.Empty:
+                break
+            if entry is None:
+                return batch, True
+            batch.append(entry)
+        return batch, False
+
+    def _run(self):
+        """Worker loop: collect a batch, process it, and resolve each waiting future."""
+        while True:
+            batch, closed = self._collect()
+            if batch:
+                self._process(batch)
+            if closed:
+                return
+
+    def _process(self, batch: List[tuple]):
+        """Run one batch through process_batch and resolve its futures."""
+        items = [item for item, _ in batch]
+        try:
+            results = self.process_batch(items)
+            # zip() would silently drop the extra futures, leaving their callers blocked forever
+            if len(results) != len(items):
+                raise ValueError(f"process_batch returned {len(results)} results for {len(items)} items")
+        except Exception as e:
+            logger.error("Error processing batch of %d items: %s", len(items), e, exc_info=True)
+            for _, future in batch:
+                future.set_exception(e)
+            return
+
+        for (_, future), result in zip(batch, results):
+            future.set_result(result)
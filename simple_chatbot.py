@@ -1,7 +1,22 @@
-from flask import Flask, request, jsonify
+from flask import Flask, Response, request
+from rapidfuzz import fuzz, process, utils
 import re
-from typing import Dict, Any, List, Tuple
+import unicodedata
+from collections import defaultdict
+from dataclasses import dataclass
+from functools import lru_cache
+from typing import Dict, Any, List, Optional, Tuple, Union
+from request_batcher import RequestBatcher
+from log_queue import start_queue_logging
 import logging
+import numpy as np
+import orjson
+
+# pyahocorasick is optional; its automaton finds every entity name in one pass over the query
+try:
+    import ahocorasick
+except ImportError:
+    ahocorasick = None
 
 app = Flask(__name__)
 
@@ -10,8 +25,99 @@ logging.basicConfig(
     level=logging.INFO,
     format='%(asctime)s - %(name)s - %(levelname)s - %(message)s'
 )
+# Records are written out by a background thread instead of the request thread
+start_queue_logging()
 logger = logging.getLogger(__name__)
 
+# Minimum token-set similarity (0-100) for the last-resort fuzzy entity match
+FUZZY_MATCH_CUTOFF = 60
+# Matches below this confidence get suggestions instead of an answer
+MIN_ANSWER_CONFIDENCE = 0.6
+# Number of formatted (entity, intent, confidence) answers kept
+ANSWER_CACHE_SIZE = 64
+
+# Whole-word keywords that pick the intent when a query names an entity but matches no pattern
+_WORD_RE = re.compile(r'\w+')
+_LOCATION_KEYWORDS = frozenset({'where', 'location', 'address', 'map'})
+_FACILITY_KEYWORDS = frozenset({'facilities', 'available', 'have', 'contains'})
+
+@dataclass(slots=True)
+class LocationResponse:
+    entity: str
+    address: Optional[str]
+    map_link: Optional[str]
+    location: Optional[str]
+    confidence: float = 1.0
+
+@dataclass(slots=True)
+class DescriptionResponse:
+    entity: str
+    description: Optional[str]
+    entity_type: Optional[str]
+    confidence: float = 1.0
+
+@dataclass(slots=True)
+class FacilitiesResponse:
+    entity: str
+    facilities: List[str]
+    description: Optional[str]
+    confidence: float = 1.0
+
+@dataclass(slots=True)
+class FallbackResponse:
+    message: str
+    suggestions: List[str]
+
+@dataclass(slots=True)
+class ErrorResponse:
+    message: str
+    confidence: float = 0.0
+
+@dataclass(slots=True)
+class FullInfoResponse:
+    entity: str
+    info: Dict[str, Any]
+    confidence: float = 1.0
+
+ChatbotResponse = Union[
+    LocationResponse, DescriptionResponse, FacilitiesResponse,
+    FallbackResponse, ErrorResponse, FullInfoResponse
+]
+
+def normalize_text(text: str) -> str:
+    """Fold text for matching: NFKC folds compatibility forms such as full-width letters, casefold folds case."""
+    return unicodedata.normalize('NFKC', text).casefold()
+
+def _question_pattern_source(pattern: str, tag: str = '') -> str:
+    """
+    Rewrite a question pattern of the form 'prefix(.*?)suffix' so matching it runs in linear time.
+    
+    A plain search retries the lazy group from every occurrence of the prefix, which is quadratic
+    when the suffix never matches. The suffix is anchored at the end, so if no match starts at the
+    prefix's first occurrence none starts at a later one either; that occurrence is located once in
+    a lookahead (atomic in re) and consumed via a backreference. The captured text is the
+    'entity' group, suffixed with tag.
+    """
+    prefix, suffix = pattern.split('(.*?)', 1)
+    return rf'(?=(?P<prefix{tag}>.*?{prefix}))(?P=prefix{tag})(?P<entity{tag}>.*?){suffix}'
+
+def compile_question_pattern(pattern: str) -> re.Pattern:
+    """Compile one question pattern; its captured text is the 'entity' group."""
+    return re.compile(r'\A' + _question_pattern_source(pattern))
+
+def combine_question_patterns(patterns: List[str]) -> re.Pattern:
+    """
+    Compile question patterns into one alternation that reports the first of them to match.
+    
+    Alternatives are tried in list order at the start of the query, so a single match call finds
+    what searching each pattern in turn would. The winner's index i is in lastgroup as 'pattern<i>'
+    and its captured text in the 'entity<i>' group.
+    """
+    return re.compile(r'\A(?:' + '|'.join(
+        f'(?P<pattern{i}>{_question_pattern_source(pattern, str(i))})'
+        for i, pattern in enumerate(patterns)
+    ) + ')')
+
 class SimpleChatbot:
     def __init__(self):
         # Knowledge base with structured information
@@ -65,69 +171,152 @@ class SimpleChatbot:
                 r'what\s+does\s+(.*?)\s+have\??$'
             ]
         }
+        # Compiled once, in table order: each pattern alone, and all of them as one alternation
+        self._pattern_intents = [
+            intent for intent, pattern_list in self.patterns.items() for _ in pattern_list
+        ]
+        pattern_sources = [pattern for pattern_list in self.patterns.values() for pattern in pattern_list]
+        self._compiled_patterns = [compile_question_pattern(pattern) for pattern in pattern_sources]
+        self._combined_pattern = combine_question_patterns(pattern_sources)
+        
+        # Parallel lists indexed by knowledge base position: names, and their normalized and split forms,
+        # so the entity scans below walk flat lists instead of looking names up per comparison
+        self._entity_names = list(self.knowledge_base)
+        self._entity_keys = [normalize_text(entity) for entity in self._entity_names]
+        self._entity_word_sets = [frozenset(entity_key.split()) for entity_key in self._entity_keys]
+        # Normalized name -> entity for exact lookups; the first entity wins if two names normalize alike
+        self._entity_by_key = {}
+        for entity, entity_key in zip(self._entity_names, self._entity_keys):
+            self._entity_by_key.setdefault(entity_key, entity)
+        # Word -> positions of the entities whose name contains it, so the word match only checks entities
+        # sharing a word with the query; names without words share none and are always checked
+        self._entity_positions_by_word = defaultdict(list)
+        self._wordless_positions = []
+        for position, entity_words in enumerate(self._entity_word_sets):
+            for word in entity_words:
+                self._entity_positions_by_word[word].append(position)
+            if not entity_words:
+                self._wordless_positions.append(position)
+        
+        # Normalized entity name -> (knowledge base position, entity), scanned in one pass per query
+        self._entity_automaton = None
+        if ahocorasick is not None:
+            self._entity_automaton = ahocorasick.Automaton()
+            for position, (entity, entity_key) in enumerate(zip(self._entity_names, self._entity_keys)):
+                if entity_key not in self._entity_automaton:
+                    self._entity_automaton.add_word(entity_key, (position, entity))
+            self._entity_automaton.make_automaton()
+        
+        # Answers depend only on the knowledge base, so formatted ones are reused; clear this if it changes
+        self._format_answer_cached = lru_cache(maxsize=ANSWER_CACHE_SIZE)(self._format_answer)
 
     def preprocess_query(self, query: str) -> str:
         """Basic query preprocessing."""
-        # Convert to lowercase
-        query = query.lower().strip()
-        # Remove multiple spaces
-        query = ' '.join(query.split())
-        return query
+        # Normalize case and compatibility forms, then collapse whitespace; split() already drops it at both ends
+        return ' '.join(normalize_text(query).split())
 
     def find_best_match(self, query: str) -> Tuple[str, str, float]:
         """Find the best matching entity and intent for a query."""
-        query = self.preprocess_query(query)
+        return self.find_best_matches([query])[0]
+
+    def find_best_matches(self, queries: List[str]) -> List[Tuple[str, str, float]]:
+        """Find the best matching entity and intent for each query, fuzzy matching the leftovers together."""
+        # Already normalized, so nothing below normalizes them again
+        queries = [self.preprocess_query(query) for query in queries]
+        matches = [self._match_exact(query) for query in queries]
         
-        # First try pattern matching
-        for intent, pattern_list in self.patterns.items():
-            for pattern in pattern_list:
-                match = re.search(pattern, query)
-                if match:
-                    entity = match.group(1).strip()
-                    # Find the closest matching entity in our knowledge base
-                    best_entity = self.find_closest_entity(entity)
-                    if best_entity:
-                        return best_entity, intent, 1.0
+        # Try fuzzy matching as a last resort, scoring every leftover query against every entity at once;
+        # the similarity doubles as the confidence
+        misses = [i for i, match in enumerate(matches) if match is None]
+        if misses and self._entity_names:
+            scores = process.cdist(
+                [queries[i] for i in misses],
+                self._entity_names,
+                scorer=fuzz.token_set_ratio,
+                processor=utils.default_process,
+                score_cutoff=FUZZY_MATCH_CUTOFF,
+                dtype=np.float64
+            )
+            for i, row in zip(misses, scores):
+                # Scores under the cutoff come back as 0; argmax picks the first entity among ties
+                best = int(row.argmax())
+                if row[best]:
+                    matches[i] = (self._entity_names[best], 'description', float(row[best]) / 100.0)
         
-        # If no pattern matches, try to find any mentioned entity
-        for entity in self.knowledge_base:
-            # Try exact match first
-            if entity.lower() in query:
-                # Try to determine intent from query keywords
-                if any(word in query.lower() for word in ['where', 'location', 'address', 'map']):
-                    return entity, 'location', 0.9
-                elif any(word in query.lower() for word in ['facilities', 'available', 'have', 'contains']):
-                    return entity, 'facilities', 0.9
-                else:
-                    return entity, 'description', 0.8
+        return [match or (None, None, 0.0) for match in matches]
+
+    def _match_exact(self, query: str) -> Optional[Tuple[str, str, float]]:
+        """Match a preprocessed query by pattern or by a mentioned entity, or return None."""
+        # First try pattern matching: one call finds the first pattern that matches
+        match = self._combined_pattern.match(query)
+        if match:
+            first = int(match.lastgroup[len('pattern'):])
+            entity = match.group(f'entity{first}')
+            for index in range(first, len(self._compiled_patterns)):
+                # Later patterns are only needed when an earlier match names no known entity
+                if index > first:
+                    match = self._compiled_patterns[index].match(query)
+                    if not match:
+                        continue
+                    entity = match.group('entity')
+                # Find the closest matching entity in our knowledge base
+                best_entity = self.find_closest_entity(entity.strip())
+                if best_entity:
+                    return best_entity, self._pattern_intents[index], 1.0
         
-        # Try fuzzy matching as a last resort
-        for entity in self.knowledge_base:
-            entity_words = set(entity.lower().split())
-            query_words = set(query.lower().split())
-            if entity_words & query_words:  # If there's any word overlap
-                return entity, 'description', 0.6
+        # If no pattern matches, try to find any mentioned entity
+        mentioned = self.find_mentioned_entities(query)
+        if mentioned:
+            entity = mentioned[0]
+            # Try to determine intent from query keywords
+            query_tokens = frozenset(_WORD_RE.findall(query))
+            if not _LOCATION_KEYWORDS.isdisjoint(query_tokens):
+                return entity, 'location', 0.9
+            elif not _FACILITY_KEYWORDS.isdisjoint(query_tokens):
+                return entity, 'facilities', 0.9
+            else:
+                return entity, 'description', 0.8
         
-        return None, None, 0.0
+        return None
+
+    def find_mentioned_entities(self, text: str) -> List[str]:
+        """Return the entities whose normalized name occurs in the normalized text, in knowledge base order."""
+        if self._entity_automaton is None:
+            return [
+                entity for entity, entity_key in zip(self._entity_names, self._entity_keys)
+                if entity_key in text
+            ]
+        hits = {value for _, value in self._entity_automaton.iter(text)}
+        return [entity for _, entity in sorted(hits)]
 
     def find_closest_entity(self, query: str) -> str:
         """Find the closest matching entity in the knowledge base."""
-        query = query.lower().strip()
+        query = normalize_text(query).strip()
         
         # First try exact match
-        for entity in self.knowledge_base:
-            if query == entity.lower():
-                return entity
+        entity = self._entity_by_key.get(query)
+        if entity is not None:
+            return entity
         
-        # Then try case-insensitive contains
-        for entity in self.knowledge_base:
-            if query in entity.lower() or entity.lower() in query:
+        # Then try case-insensitive contains; names inside the query come from one automaton scan,
+        # so only the entities ahead of the first of them need the reverse check
+        mentioned = self.find_mentioned_entities(query)
+        first_mentioned = mentioned[0] if mentioned else None
+        for entity, entity_key in zip(self._entity_names, self._entity_keys):
+            if entity == first_mentioned or query in entity_key:
                 return entity
             
-        # Try matching individual words
+        # Try matching individual words; either subset test needs a shared word unless one side has none
         query_words = set(query.split())
-        for entity in self.knowledge_base:
-            entity_words = set(entity.lower().split())
+        if query_words:
+            positions = sorted({
+                position for word in query_words
+                for position in self._entity_positions_by_word.get(word, ())
+            }.union(self._wordless_positions))
+        else:
+            positions = range(len(self._entity_names))
+        for position in positions:
+            entity, entity_words = self._entity_names[position], self._entity_word_sets[position]
             # If all words in the entity name are in the query
             if entity_words.issubset(query_words):
                 return entity
@@ -137,44 +326,34 @@ class SimpleChatbot:
         
         return None
 
-    def get_response(self, entity: str, intent: str) -> Dict[str, Any]:
+    def get_response(self, entity: str, intent: str) -> ChatbotResponse:
         """Generate a response based on the entity and intent."""
         data = self.knowledge_base.get(entity)
         if not data:
-            return {
-                'type': 'error',
-                'message': f"I don't have information about {entity}."
-            }
+            return ErrorResponse(message=f"I don't have information about {entity}.")
 
         if intent == 'location':
-            return {
-                'type': 'location',
-                'entity': entity,
-                'address': data.get('address'),
-                'map_link': data.get('map_link'),
-                'location': data.get('location')
-            }
+            return LocationResponse(
+                entity=entity,
+                address=data.get('address'),
+                map_link=data.get('map_link'),
+                location=data.get('location')
+            )
         elif intent == 'description':
-            return {
-                'type': 'description',
-                'entity': entity,
-                'description': data.get('description'),
-                'type': data.get('type')
-            }
+            return DescriptionResponse(
+                entity=entity,
+                description=data.get('description'),
+                entity_type=data.get('type')
+            )
         elif intent == 'facilities':
-            return {
-                'type': 'facilities',
-                'entity': entity,
-                'facilities': data.get('facilities', []),
-                'description': data.get('description')
-            }
+            return FacilitiesResponse(
+                entity=entity,
+                facilities=data.get('facilities', []),
+                description=data.get('description')
+            )
         
         # Fallback to full information
-        return {
-            'type': 'full_info',
-            'entity': entity,
-            'info': data
-        }
+        return FullInfoResponse(entity=entity, info=data)
 
     def get_similar_questions(self, entity: str) -> List[str]:
         """Generate example questions for an entity."""
@@ -188,130 +367,171 @@ class SimpleChatbot:
             ])
         return examples
 
-    def process_query(self, query: str) -> Dict[str, Any]:
+    def process_query(self, query: str) -> ChatbotResponse:
         """Process a user query and return a response."""
-        entity, intent, confidence = self.find_best_match(query)
-        
-        if not entity or confidence < 0.6:
+        return self.process_queries([query])[0]
+
+    def process_queries(self, queries: List[str]) -> List[ChatbotResponse]:
+        """Process several user queries, matching them as one batch, and return a response for each."""
+        return [
+            self._respond(query, *match)
+            for query, match in zip(queries, self.find_best_matches(queries))
+        ]
+
+    def answer_query(self, query: str) -> Dict[str, Any]:
+        """Process a user query and return its formatted response."""
+        return self.answer_queries([query])[0]
+
+    def answer_queries(self, queries: List[str]) -> List[Dict[str, Any]]:
+        """Process and format several user queries; answers for a known match come from a cache."""
+        answers = []
+        for query, (entity, intent, confidence) in zip(queries, self.find_best_matches(queries)):
+            if entity and confidence >= MIN_ANSWER_CONFIDENCE:
+                answers.append(dict(self._format_answer_cached(entity, intent, confidence)))
+            else:
+                answers.append(format_response(self._respond(query, entity, intent, confidence)))
+        return answers
+
+    def _format_answer(self, entity: str, intent: str, confidence: float) -> Dict[str, Any]:
+        """Format the answer for a matched entity and intent."""
+        response = self.get_response(entity, intent)
+        response.confidence = confidence
+        return format_response(response)
+
+    def _respond(self, query: str, entity: str, intent: str, confidence: float) -> ChatbotResponse:
+        """Build the response for a query from its best match."""
+        if not entity or confidence < MIN_ANSWER_CONFIDENCE:
             # Try to find any mentioned entity for suggestions
-            for known_entity in self.knowledge_base:
-                if known_entity.lower() in query.lower():
-                    suggestions = self.get_similar_questions(known_entity)
-                    return {
-                        'type': 'fallback',
-                        'message': "I'm not quite sure what you're asking. Here are some questions you can try:",
-                        'suggestions': suggestions
-                    }
+            mentioned = self.find_mentioned_entities(normalize_text(query))
+            if mentioned:
+                suggestions = self.get_similar_questions(mentioned[0])
+                return FallbackResponse(
+                    message="I'm not quite sure what you're asking. Here are some questions you can try:",
+                    suggestions=suggestions
+                )
             
             # No entity found at all
-            return {
-                'type': 'fallback',
-                'message': "I'm not sure what you're asking about. Here are some locations I know about:",
-                'suggestions': [f"Tell me about {entity}" for entity in self.knowledge_base]
-            }
+            return FallbackResponse(
+                message="I'm not sure what you're asking about. Here are some locations I know about:",
+                suggestions=[f"Tell me about {entity}" for entity in self.knowledge_base]
+            )
         
         response = self.get_response(entity, intent)
-        response['confidence'] = confidence
+        response.confidence = confidence
         return response
 
-def format_response(response_data: Dict[str, Any]) -> Dict[str, Any]:
+def _format_location(response: LocationResponse) -> Dict[str, Any]:
+    """Format a location answer with its address, campus and map link."""
+    response_text = f"{response.entity} is located at {response.address}."
+    if response.location:
+        response_text += f" You can find it in {response.location}."
+    if response.map_link:
+        response_text += f"\nHere's a map link: {response.map_link}"
+    
+    return {
+        'response': response_text,
+        'confidence': response.confidence
+    }
+
+def _format_description(response: DescriptionResponse) -> Dict[str, Any]:
+    """Format an entity's description."""
+    if response.description is None:
+        return {
+            'response': "Sorry, I don't have any information about that.",
+            'confidence': 0.0
+        }
+    return {
+        'response': f"{response.entity}: {response.description}",
+        'confidence': response.confidence
+    }
+
+def _format_facilities(response: FacilitiesResponse) -> Dict[str, Any]:
+    """Format an entity's facilities followed by its description."""
+    if not response.facilities:
+        response_text = f"No facilities information available for {response.entity}."
+    else:
+        facilities_list = ", ".join(response.facilities)
+        response_text = f"{response.entity} has the following facilities: {facilities_list}."
+    
+    if response.description:
+        response_text += f"\n{response.description}"
+    
+    return {
+        'response': response_text,
+        'confidence': response.confidence
+    }
+
+def _format_fallback(response: FallbackResponse) -> Dict[str, Any]:
+    """Format a fallback message and its suggested questions."""
+    response_text = response.message
+    if response.suggestions:
+        suggestions_text = "\n".join([f"- {q}" for q in response.suggestions])
+        response_text += f"\n\nYou might want to try:\n{suggestions_text}"
+    
+    return {
+        'response': response_text,
+        'confidence': 0.0
+    }
+
+def _format_error(response: ErrorResponse) -> Dict[str, Any]:
+    """Format an error message."""
+    return {
+        'response': response.message,
+        'confidence': 0.0
+    }
+
+def _format_full_info(response: FullInfoResponse) -> Dict[str, Any]:
+    """Format every known attribute of an entity."""
+    info = response.info
+    if not info:
+        return {
+            'response': "Sorry, I don't have any information about that.",
+            'confidence': 0.0
+        }
+    
+    formatted_info = []
+    for k, v in info.items():
+        if k != 'id' and v is not None:
+            if isinstance(v, list):
+                formatted_info.append(f"{k}: {', '.join(map(str, v))}")
+            else:
+                formatted_info.append(f"{k}: {v}")
+    
+    if not formatted_info:
+        return {
+            'response': f"No detailed information available for {info.get('id', 'this item')}.",
+            'confidence': 0.0
+        }
+    
+    return {
+        'response': f"Here's what I know about {info.get('id', 'this')}:\n" + 
+                   "\n".join(formatted_info),
+        'confidence': response.confidence
+    }
+
+# Response class -> formatter, so format_response dispatches with one lookup
+_FORMATTERS = {
+    LocationResponse: _format_location,
+    DescriptionResponse: _format_description,
+    FacilitiesResponse: _format_facilities,
+    FallbackResponse: _format_fallback,
+    ErrorResponse: _format_error,
+    FullInfoResponse: _format_full_info
+}
+
+def format_response(response_data: ChatbotResponse) -> Dict[str, Any]:
     """Format the response based on its type."""
     try:
-        response_type = response_data.get('type', 'unknown')
-        
-        if response_type == 'location':
-            address = response_data.get('address', 'No address available')
-            location = response_data.get('location', '')
-            map_link = response_data.get('map_link', '')
-            
-            response_text = f"{response_data['entity']} is located at {address}."
-            if location:
-                response_text += f" You can find it in {location}."
-            if map_link:
-                response_text += f"\nHere's a map link: {map_link}"
-            
-            return {
-                'response': response_text,
-                'confidence': response_data.get('confidence', 1.0)
-            }
-        
-        elif response_type == 'description':
-            entity = response_data.get('entity', 'Unknown')
-            description = response_data.get('description', 'No description available.')
-            return {
-                'response': f"{entity}: {description}",
-                'confidence': response_data.get('confidence', 1.0)
-            }
-        
-        elif response_type == 'facilities':
-            entity = response_data.get('entity', 'Unknown')
-            facilities = response_data.get('facilities', [])
-            description = response_data.get('description', '')
-            
-            if not facilities:
-                response_text = f"No facilities information available for {entity}."
-            else:
-                facilities_list = ", ".join(facilities)
-                response_text = f"{entity} has the following facilities: {facilities_list}."
-            
-            if description:
-                response_text += f"\n{description}"
-            
-            return {
-                'response': response_text,
-                'confidence': response_data.get('confidence', 1.0)
-            }
-        
-        elif response_type == 'fallback':
-            message = response_data.get('message', "I'm not sure how to help with that.")
-            suggestions = response_data.get('suggestions', [])
-            
-            response_text = message
-            if suggestions:
-                suggestions_text = "\n".join([f"- {q}" for q in suggestions])
-                response_text += f"\n\nYou might want to try:\n{suggestions_text}"
-            
-            return {
-                'response': response_text,
-                'confidence': 0.0
-            }
-        
-        elif response_type == 'error':
-            return {
-                'response': response_data.get('message', "Sorry, I couldn't process your request."),
-                'confidence': 0.0
-            }
-        
-        # Default full info response
-        info = response_data.get('info', {})
-        if not info:
+        formatter = _FORMATTERS.get(type(response_data))
+        if formatter is None:
             return {
                 'response': "Sorry, I don't have any information about that.",
                 'confidence': 0.0
             }
-        
-        formatted_info = []
-        for k, v in info.items():
-            if k != 'id' and v is not None:
-                if isinstance(v, list):
-                    formatted_info.append(f"{k}: {', '.join(map(str, v))}")
-                else:
-                    formatted_info.append(f"{k}: {v}")
-        
-        if not formatted_info:
-            return {
-                'response': f"No detailed information available for {info.get('id', 'this item')}.",
-                'confidence': 0.0
-            }
-        
-        return {
-            'response': f"Here's what I know about {info.get('id', 'this')}:\n" + 
-                       "\n".join(formatted_info),
-            'confidence': response_data.get('confidence', 1.0)
-        }
+        return formatter(response_data)
         
     except Exception as e:
-        logger.error("Error formatting response: %s", str(e), exc_info=True)
+        logger.error("Error formatting response: %s", e, exc_info=True)
         return {
             'response': "Sorry, there was an error formatting the response.",
             'confidence': 0.0
@@ -320,46 +540,68 @@ def format_response(response_data: Dict[str, Any]) -> Dict[str, Any]:
 # Initialize the chatbot
 chatbot = SimpleChatbot()
 
+# Messages from concurrent requests arriving within 2ms are matched as one batch
+batcher = RequestBatcher(chatbot.answer_queries, max_batch_size=16, max_wait=0.002)
+REQUEST_TIMEOUT = 30
+# Longer messages are rejected before matching, which bounds the regex and fuzzy matching work per request
+MAX_MESSAGE_LENGTH = 2048
+
+def json_response(payload, status: int = 200) -> Response:
+    """Serialize a payload with orjson instead of Flask's stdlib-based jsonify."""
+    return Response(
+        orjson.dumps(payload, option=orjson.OPT_SERIALIZE_NUMPY),
+        status=status,
+        mimetype='application/json'
+    )
+
 @app.route('/chat', methods=['POST'])
 def chat():
+    # Bad input is answered without building an exception traceback for the log
     try:
-        data = request.get_json()
-        if not data or 'message' not in data:
-            logger.error("Invalid request data: %s", data)
-            return jsonify({
-                'error': 'No message provided',
-                'response': 'Please provide a message to process.'
-            }), 400
-
-        user_message = data['message']
-        logger.info("Processing message: %s", user_message)
-
-        # Process the message
-        try:
-            response_data = chatbot.process_query(user_message)
-            logger.info("Generated response data: %s", response_data)
-            
-            formatted_response = format_response(response_data)
-            logger.info("Formatted response: %s", formatted_response)
-            
-            return jsonify(formatted_response)
-        except Exception as e:
-            logger.error("Error in query processing: %s", str(e), exc_info=True)
-            return jsonify({
-                'error': 'Processing error',
-                'response': f"Error processing query: {str(e)}"
-            }), 500
+        data = orjson.loads(request.get_data())
+    except orjson.JSONDecodeError as e:
+        logger.error("Malformed request body: %s", e)
+        return json_response({
+            'error': 'Malformed JSON',
+            'response': 'Please send the message as a JSON object.'
+        }, 400)
 
+    if not isinstance(data, dict) or 'message' not in data:
+        logger.error("Invalid request data: %s", data)
+        return json_response({
+            'error': 'No message provided',
+            'response': 'Please provide a message to process.'
+        }, 400)
+
+    user_message = data['message']
+
+    # Empty, non-string and oversized messages never reach the batch, so they cost no matching work
+    # and cannot fail the other requests batched with them
+    if not user_message or not isinstance(user_message, str) or len(user_message) > MAX_MESSAGE_LENGTH:
+        logger.error("Invalid message: %.100r", user_message)
+        return json_response({
+            'error': 'Invalid message',
+            'response': f"Please provide a non-empty message of at most {MAX_MESSAGE_LENGTH} characters."
+        }, 400)
+
+    logger.info("Processing message: %s", user_message)
+
+    # Process the message as part of the next batch
+    try:
+        formatted_response = batcher.submit(user_message).result(timeout=REQUEST_TIMEOUT)
     except Exception as e:
-        logger.error("Error in request handling: %s", str(e), exc_info=True)
-        return jsonify({
-            'error': 'Internal server error',
-            'response': "I'm sorry, but I encountered an error processing your request. Please try again."
-        }), 500
+        logger.error("Error in query processing: %s", e, exc_info=True)
+        return json_response({
+            'error': 'Processing error',
+            'response': f"Error processing query: {e}"
+        }, 500)
+
+    logger.info("Formatted response: %s", formatted_response)
+    return json_response(formatted_response)
 
 @app.route('/health', methods=['GET'])
 def health_check():
-    return jsonify({'status': 'healthy', 'message': 'ORB AI is running'}), 200
+    return json_response({'status': 'healthy', 'message': 'ORB AI is running'}, 200)
 
 if __name__ == '__main__':
     app.run(host='0.0.0.0', port=5000, debug=True) 
\ No newline at end of file
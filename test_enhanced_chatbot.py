@@ -1,144 +1,147 @@
-import unittest
+"""
+Tests for EnhancedChatbot.
+
+Each test gets its own conversation on a shared chatbot, so the tests are
+independent and can run in parallel with pytest-xdist
+(pip install -r requirements-test.txt):
+
+    pytest -n auto test_enhanced_chatbot.py
+"""
+import pytest
 from enhanced_chatbot import EnhancedChatbot
-import json
-import logging
-
-class TestEnhancedChatbot(unittest.TestCase):
-    @classmethod
-    def setUpClass(cls):
-        """Set up test fixtures."""
-        cls.chatbot = EnhancedChatbot()
-        cls.session_id = cls.chatbot.start_conversation()
-
-    def test_basic_query(self):
-        """Test basic query handling."""
-        query = "Where is the Tech Park?"
-        response = self.chatbot.process_query(query, self.session_id)
-        
-        self.assertIsNotNone(response)
-        self.assertIn('response', response)
-        self.assertIn('confidence', response)
-        self.assertTrue(response['confidence'] > 0.6)
-        self.assertIn('Tech Park', response['response'])
-
-    def test_followup_query(self):
-        """Test follow-up query handling."""
-        # First query
-        query1 = "Tell me about the Central Library"
-        response1 = self.chatbot.process_query(query1, self.session_id)
-        
-        # Follow-up query
-        query2 = "What are its timings?"
-        response2 = self.chatbot.process_query(query2, self.session_id)
-        
-        self.assertIsNotNone(response2)
-        self.assertIn('response', response2)
-        self.assertTrue(response2['confidence'] > 0.6)
-        self.assertIn('timing', response2['response'].lower())
-
-    def test_unknown_query(self):
-        """Test handling of unknown queries."""
-        query = "What is the meaning of life?"
-        response = self.chatbot.process_query(query, self.session_id)
-        
-        self.assertIsNotNone(response)
-        self.assertIn('response', response)
-        self.assertTrue(response['confidence'] < 0.6)
-        self.assertIn('suggestions', response)
-
-    def test_entity_recognition(self):
-        """Test entity recognition in queries."""
-        queries = [
-            "Where is Tech Park located?",
-            "Tell me about the Central Library",
-            "What are the hostel facilities?"
-        ]
-        
-        for query in queries:
-            response = self.chatbot.process_query(query, self.session_id)
-            self.assertIsNotNone(response)
-            self.assertIn('response', response)
-            self.assertTrue(response['confidence'] > 0.6)
-
-    def test_conversation_context(self):
-        """Test conversation context management."""
-        # Initial query
-        query1 = "Tell me about Tech Park"
-        response1 = self.chatbot.process_query(query1, self.session_id)
-        
-        # Follow-up queries
-        queries = [
-            "What facilities does it have?",
-            "Where is it located?",
-            "How can I reach there?"
-        ]
-        
-        for query in queries:
-            response = self.chatbot.process_query(query, self.session_id)
-            self.assertIsNotNone(response)
-            self.assertIn('response', response)
-            self.assertTrue(response['confidence'] > 0.5)
-
-    def test_intent_detection(self):
-        """Test intent detection for different query types."""
-        test_cases = [
-            ("Where is the Tech Park?", "location"),
-            ("What facilities does the library have?", "facilities"),
-            ("How do I contact the admissions office?", "contact"),
-            ("Tell me about the hostel", "description")
-        ]
-        
-        for query, expected_intent in test_cases:
-            response = self.chatbot.process_query(query, self.session_id)
-            self.assertIn('response', response)
-            self.assertTrue(response['confidence'] > 0.6)
-
-    def test_fallback_mechanism(self):
-        """Test fallback mechanism for unclear queries."""
-        unclear_queries = [
-            "What about that thing?",
-            "Can you help me?",
-            "I need information"
-        ]
-        
-        for query in unclear_queries:
-            response = self.chatbot.process_query(query, self.session_id)
-            self.assertIn('suggestions', response)
-            self.assertTrue(len(response['suggestions']) > 0)
-
-    def test_conversation_summary(self):
-        """Test conversation summary functionality."""
-        # Make a series of queries
-        queries = [
-            "Where is Tech Park?",
-            "What facilities does it have?",
-            "Tell me about the Central Library"
-        ]
-        
-        for query in queries:
-            self.chatbot.process_query(query, self.session_id)
-        
-        # Get conversation summary
-        summary = self.chatbot.get_conversation_summary(self.session_id)
-        
-        self.assertIsNotNone(summary)
-        self.assertIn('num_interactions', summary)
-        self.assertEqual(summary['num_interactions'], len(queries))
-        self.assertIn('mentioned_entities', summary)
-
-    def test_error_handling(self):
-        """Test error handling capabilities."""
-        # Test with empty query
-        response = self.chatbot.process_query("", self.session_id)
-        self.assertIn('error', response)
-        
-        # Test with None query
-        response = self.chatbot.process_query(None, self.session_id)
-        self.assertIn('error', response)
-
-if __name__ == '__main__':
-    # Configure logging for tests
-    logging.basicConfig(level=logging.INFO)
-    
-    # Run the tests
-    unittest.main() 
\ No newline at end of file
+
+@pytest.fixture(scope='session')
+def chatbot():
+    """Build the chatbot, and its models, once per test process."""
+    return EnhancedChatbot()
+
+@pytest.fixture
+def session_id(chatbot):
+    """Start a fresh conversation for each test."""
+    return chatbot.start_conversation()
+
+def test_basic_query(chatbot, session_id):
+    """Test basic query handling."""
+    query = "Where is the Tech Park?"
+    response = chatbot.process_query(query, session_id)
+
+    assert response is not None
+    assert 'response' in response
+    assert 'confidence' in response
+    assert response['confidence'] > 0.6
+    assert 'Tech Park' in response['response']
+
+def test_followup_query(chatbot, session_id):
+    """Test follow-up query handling."""
+    # First query
+    query1 = "Tell me about the Central Library"
+    chatbot.process_query(query1, session_id)
+
+    # Follow-up query
+    query2 = "What are its timings?"
+    response2 = chatbot.process_query(query2, session_id)
+
+    assert response2 is not None
+    assert 'response' in response2
+    assert response2['confidence'] > 0.6
+    assert 'timing' in response2['response'].lower()
+
+def test_unknown_query(chatbot, session_id):
+    """Test handling of unknown queries."""
+    query = "What is the meaning of life?"
+    response = chatbot.process_query(query, session_id)
+
+    assert response is not None
+    assert 'response' in response
+    assert response['confidence'] < 0.6
+    assert 'suggestions' in response
+
+def test_entity_recognition(chatbot, session_id):
+    """Test entity recognition in queries."""
+    queries = [
+        "Where is Tech Park located?",
+        "Tell me about the Central Library",
+        "What are the hostel facilities?"
+    ]
+
+    for query in queries:
+        response = chatbot.process_query(query, session_id)
+        assert response is not None
+        assert 'response' in response
+        assert response['confidence'] > 0.6
+
+def test_conversation_context(chatbot, session_id):
+    """Test conversation context management."""
+    # Initial query
+    query1 = "Tell me about Tech Park"
+    chatbot.process_query(query1, session_id)
+
+    # Follow-up queries
+    queries = [
+        "What facilities does it have?",
+        "Where is it located?",
+        "How can I reach there?"
+    ]
+
+    for query in queries:
+        response = chatbot.process_query(query, session_id)
+        assert response is not None
+        assert 'response' in response
+        assert response['confidence'] > 0.5
+
+@pytest.mark.parametrize('query, expected_intent', [
+    ("Where is the Tech Park?", "location"),
+    pytest.param(
+        "What facilities does the library have?", "facilities",
+        marks=pytest.mark.xfail(reason="NLUModule has no 'facilities' intent; this query detects as 'general'")
+    ),
+    ("How do I contact the admissions office?", "contact"),
+    ("Tell me about the hostel", "description")
+])
+def test_intent_detection(chatbot, session_id, query, expected_intent):
+    """Test intent detection for different query types."""
+    response = chatbot.process_query(query, session_id)
+    assert 'response' in response
+    assert response['confidence'] > 0.6
+    assert chatbot.nlu.analyze_query(query)['intent'] == expected_intent
+
+@pytest.mark.parametrize('query', [
+    "What about that thing?",
+    "Can you help me?",
+    "I need information"
+])
+def test_fallback_mechanism(chatbot, session_id, query):
+    """Test fallback mechanism for unclear queries."""
+    response = chatbot.process_query(query, session_id)
+    assert 'suggestions' in response
+    assert len(response['suggestions']) > 0
+
+def test_conversation_summary(chatbot, session_id):
+    """Test conversation summary functionality."""
+    # Make a series of queries
+    queries = [
+        "Where is Tech Park?",
+        "What facilities does it have?",
+        "Tell me about the Central Library"
+    ]
+
+    for query in queries:
+        chatbot.process_query(query, session_id)
+
+    # Get conversation summary
+    summary = chatbot.get_conversation_summary(session_id)
+
+    assert summary is not None
+    assert 'num_interactions' in summary
+    assert summary['num_interactions'] == len(queries)
+    assert 'mentioned_entities' in summary
+
+def test_error_handling(chatbot, session_id):
+    """Test error handling capabilities."""
+    # Test with empty query
+    response = chatbot.process_query("", session_id)
+    assert 'error' in response
+
+    # Test with None query
+    response = chatbot.process_query(None, session_id)
+    assert 'error' in response
@@ -0,0 +1,125 @@
+"""
+Tests for SRMKnowledgeGraph's text search index, search memo, CSR
+adjacency snapshot and casefolded id index.
+"""
+import pytest
+
+import knowledge_graph
+from knowledge_graph import SRMKnowledgeGraph
+
+@pytest.fixture
+def graph():
+    """A fresh graph per test, since several tests add nodes and edges."""
+    return SRMKnowledgeGraph()
+
+@pytest.fixture
+def indexed(monkeypatch):
+    """Search through the inverted index even on the small shipped graph."""
+    monkeypatch.setattr(knowledge_graph, 'INDEX_MIN_NODES', 0)
+
+def scan_all(graph, query):
+    """Reference search: check every node's text, in graph order, without the inverted index."""
+    query = query.lower()
+    return [node_id for node_id in graph.graph if query in graph._node_search_blob[node_id]]
+
+@pytest.mark.parametrize('query', [
+    'tech park', 'Library', 'park', 'ech pa', 'chennai', 'b.tech', 'wi-fi', 'law', 'campus', 'xyz', '',
+    'research labs and industry', ' park', 'tech ', 'ch park, inn'
+])
+def test_search_matches_full_scan(graph, indexed, query):
+    """Narrowing through the inverted index finds the same nodes, in the same order, as a full scan."""
+    assert [result['id'] for result in graph.search_by_text(query)] == scan_all(graph, query)
+
+def test_candidates_cover_every_match(graph):
+    """Every node containing the query is among the index's candidates."""
+    candidates = graph._candidate_nodes('tech park')
+
+    assert {'Tech Park', 'Kattankulathur'} <= candidates
+    assert graph._candidate_nodes('tech xyzzy park') == set()
+
+def test_single_bare_word_is_not_narrowed(graph):
+    """A word that may sit anywhere inside a token leaves the search to the full scan."""
+    assert graph._candidate_nodes('ech') is None
+
+def test_index_follows_node_updates(graph, indexed):
+    """Re-adding a node drops its old tokens and indexes the new ones."""
+    graph.add_entity('Gym', 'facility', {'description': 'Open air courts'})
+    graph.add_entity('Gym', 'facility', {'description': 'Indoor weights'})
+
+    assert graph.search_by_text('open air') == []
+    assert [result['id'] for result in graph.search_by_text('indoor weights')] == ['Gym']
+
+def test_related_entities_match_networkx(graph):
+    """The CSR snapshot yields the same neighbours, in the same order, as the graph's edges."""
+    for node_id in graph.graph:
+        expected = [
+            (neighbor, data['relationship'])
+            for _, neighbor, data in graph.graph.out_edges(node_id, data=True)
+        ]
+        related = graph.get_related_entities(node_id)
+
+        assert [(entity['id'], entity['relationship']) for entity in related] == expected
+
+def test_related_entities_by_relationship(graph):
+    """Filtering by relationship keeps only those edges; unknown ones give nothing."""
+    offers = graph.get_related_entities('Kattankulathur', 'offers')
+
+    assert {entity['id'] for entity in offers} == set(graph.entities['programs'])
+    assert all(entity['relationship'] == 'offers' for entity in offers)
+    assert graph.get_related_entities('Kattankulathur', 'no_such_relation') == []
+    assert graph.get_related_entities('No Such Node') == []
+
+def test_adjacency_rebuilt_after_new_edge(graph):
+    """Adding a relationship invalidates the CSR snapshot."""
+    graph.get_related_entities('Sikkim')
+    graph.add_relationship('Sikkim', 'Tech Park', 'partners_with')
+
+    related = graph.get_related_entities('Sikkim', 'partners_with')
+    assert [entity['id'] for entity in related] == ['Tech Park']
+
+def test_search_memo_returns_fresh_copies(graph):
+    """Repeated searches hit the memo but callers cannot alter the memoized results."""
+    first = graph.search_by_text('Tech Park')
+    first[0]['id'] = 'changed'
+    first.append({'id': 'extra'})
+
+    second = graph.search_by_text('tech park')
+    assert [result['id'] for result in second] == scan_all(graph, 'tech park')
+    assert len(graph._search_cache) == 1
+
+def test_search_memo_invalidated_by_graph_changes(graph):
+    """A new node becomes searchable even when the query was memoized before it existed."""
+    assert graph.search_by_text('robotics') == []
+    version = graph.version
+
+    graph.add_entity('Robotics Lab', 'location', {'location': 'Tech Park'})
+
+    assert graph.version > version
+    assert [result['id'] for result in graph.search_by_text('robotics')] == ['Robotics Lab']
+
+def test_search_by_text_many_dedupes_queries(graph):
+    """Each distinct query is searched once and keyed in first-seen order."""
+    results = graph.search_by_text_many(['library', 'hostel', 'library'])
+
+    assert list(results) == ['library', 'hostel']
+    assert [result['id'] for result in results['library']] == scan_all(graph, 'library')
+
+def test_ids_resolve_case_insensitively(graph):
+    """Lowercased entities find their nodes; unknown ones do not."""
+    assert graph.resolve_id('Tech Park') == 'Tech Park'
+    assert graph.resolve_id('tech park') == 'Tech Park'
+    assert graph.resolve_id('KATTANKULATHUR') == 'Kattankulathur'
+    assert graph.resolve_id('nowhere') is None
+
+def test_query_multi_keys_by_given_id(graph):
+    """Hits are keyed by the caller's spelling but carry the node's real id and type."""
+    hits = graph.query_multi(['tech park', 'engineering', 'nowhere'], ('location', 'program'))
+
+    assert set(hits) == {'tech park', 'engineering'}
+    assert hits['tech park'][0] == 'location'
+    assert hits['tech park'][1][0]['id'] == 'Tech Park'
+    assert hits['engineering'][1][0]['id'] == 'Engineering'
+
+def test_query_multi_filters_by_type(graph):
+    """Nodes of a type that was not asked for are skipped."""
+    assert graph.query_multi(['tech park'], ('campus',)) == {}
@@ -0,0 +1,101 @@
+"""
+Tests for the queued logging setup.
+"""
+import logging
+import threading
+from logging.handlers import QueueHandler
+
+import pytest
+
+import log_queue
+
+def queue_handlers():
+    """The root logger's queue handlers; pytest adds its own capture handlers alongside them."""
+    return [handler for handler in logging.getLogger().handlers if isinstance(handler, QueueHandler)]
+
+class ListHandler(logging.Handler):
+    """Handler keeping the messages it is given."""
+
+    def __init__(self):
+        super().__init__()
+        self.messages = []
+        self.threads = []
+        self.received = threading.Event()
+
+    def emit(self, record):
+        self.messages.append(record.getMessage())
+        self.threads.append(threading.current_thread())
+        self.received.set()
+
+@pytest.fixture
+def queued_logging(monkeypatch):
+    """Route a fresh root logger through start_queue_logging and restore it afterwards."""
+    root = logging.getLogger()
+    saved_handlers = root.handlers[:]
+    saved_level = root.level
+    handler = ListHandler()
+    root.handlers = [handler]
+    root.setLevel(logging.INFO)
+    monkeypatch.setattr(log_queue, '_listener', None)
+    monkeypatch.setattr(log_queue.atexit, 'register', lambda func: None)
+    monkeypatch.setattr(log_queue.os, 'register_at_fork', lambda **kwargs: None, raising=False)
+
+    log_queue.start_queue_logging()
+    yield handler
+
+    log_queue._stop_listener()
+    root.handlers = saved_handlers
+    root.setLevel(saved_level)
+
+def test_queue_logging_replaces_root_handlers(queued_logging):
+    """The root logger only enqueues; the original handler sits behind the listener."""
+    handlers = logging.getLogger().handlers
+
+    assert queued_logging not in handlers
+    assert len(queue_handlers()) == 1
+
+def test_queue_logging_writes_on_listener_thread(queued_logging):
+    """Records reach the original handler from the listener thread."""
+    logging.getLogger('test').info("hello %s", "queue")
+
+    assert queued_logging.received.wait(5)
+    assert queued_logging.messages == ["hello queue"]
+    assert queued_logging.threads[0] is not threading.current_thread()
+
+def test_queue_logging_is_idempotent(queued_logging):
+    """A second call leaves the single queue handler in place."""
+    log_queue.start_queue_logging()
+
+    assert len(queue_handlers()) == 1
+
+def test_restart_listener_swaps_in_fresh_queue(queued_logging):
+    """After a fork the queue handler feeds a new queue drained by a new listener."""
+    queue_handler, = queue_handlers()
+    old_queue = queue_handler.queue
+    log_queue._stop_listener()
+
+    log_queue._restart_listener([queued_logging])
+    logging.getLogger('test').info("after fork")
+
+    assert queue_handler.queue is not old_queue
+    assert queued_logging.received.wait(5)
+    assert queued_logging.messages == ["after fork"]
+
+def test_queue_logging_formats_on_listener_thread(queued_logging):
+    """Arguments are rendered by the listener, not by the thread that logged them."""
+    rendered_on = []
+
+    class Payload:
+        def __str__(self):
+            rendered_on.append(threading.current_thread())
+            return 'payload'
+
+    # Straight to the queue handler, since pytest's own capture handlers also sit on the root logger
+    record = logging.LogRecord('test', logging.INFO, __file__, 0, "response: %s", (Payload(),), None)
+    queue_handler, = queue_handlers()
+    queue_handler.handle(record)
+
+    assert queued_logging.received.wait(5)
+    assert queued_logging.messages == ["response: payload"]
+    assert rendered_on
+    assert threading.current_thread() not in rendered_on
@@ -0,0 +1,137 @@
+"""
+Tests for RequestBatcher.
+"""
+import os
+import time
+from concurrent.futures import ThreadPoolExecutor
+
+import pytest
+
+from request_batcher import RequestBatcher
+
+class RecordingBatch:
+    """process_batch stand-in that records every batch it is given."""
+
+    def __init__(self, transform=lambda item: item * 2):
+        self.transform = transform
+        self.batches = []
+
+    def __call__(self, items):
+        self.batches.append(list(items))
+        return [self.transform(item) for item in items]
+
+@pytest.fixture
+def make_batcher():
+    """Build batchers that are closed again after the test."""
+    batchers = []
+
+    def make(process_batch, **kwargs):
+        batcher = RequestBatcher(process_batch, **kwargs)
+        batchers.append(batcher)
+        return batcher
+
+    yield make
+    for batcher in batchers:
+        batcher.close()
+
+def test_results_match_items(make_batcher):
+    """Each future resolves with the result for its own item."""
+    batcher = make_batcher(RecordingBatch(), max_batch_size=4, max_wait=0.01)
+    futures = [batcher.submit(i) for i in range(10)]
+
+    assert [future.result(timeout=5) for future in futures] == [i * 2 for i in range(10)]
+
+def test_batches_respect_max_batch_size(make_batcher):
+    """Items queued together are split into batches no larger than max_batch_size."""
+    process_batch = RecordingBatch()
+    batcher = make_batcher(process_batch, max_batch_size=3, max_wait=0.05)
+    futures = [batcher.submit(i) for i in range(7)]
+    for future in futures:
+        future.result(timeout=5)
+
+    assert all(len(batch) <= 3 for batch in process_batch.batches)
+    assert [item for batch in process_batch.batches for item in batch] == list(range(7))
+
+def test_concurrent_submits_are_coalesced(make_batcher):
+    """Submissions from several threads inside one window share a batch."""
+    process_batch = RecordingBatch()
+    batcher = make_batcher(process_batch, max_batch_size=16, max_wait=0.2)
+    with ThreadPoolExecutor(max_workers=8) as pool:
+        results = list(pool.map(lambda i: batcher.submit(i).result(timeout=5), range(8)))
+
+    assert results == [i * 2 for i in range(8)]
+    assert len(process_batch.batches) < 8
+
+def test_lone_item_is_flushed_after_max_wait(make_batcher):
+    """A single item does not wait for a full batch, only for the window to close."""
+    batcher = make_batcher(RecordingBatch(), max_batch_size=100, max_wait=0.05)
+    start = time.monotonic()
+
+    assert batcher.submit(21).result(timeout=5) == 42
+    assert time.monotonic() - start < 2
+
+def test_exception_propagates_to_every_future(make_batcher):
+    """A failing batch fails each of its futures with the same error."""
+    def fail(items):
+        raise RuntimeError("encoder unavailable")
+
+    batcher = make_batcher(fail, max_batch_size=4, max_wait=0.05)
+    futures = [batcher.submit(i) for i in range(3)]
+
+    for future in futures:
+        with pytest.raises(RuntimeError, match="encoder unavailable"):
+            future.result(timeout=5)
+
+def test_worker_survives_a_failed_batch(make_batcher):
+    """Batches after a failure are still processed."""
+    calls = []
+
+    def flaky(items):
+        calls.append(items)
+        if len(calls) == 1:
+            raise RuntimeError("first batch fails")
+        return items
+
+    batcher = make_batcher(flaky, max_batch_size=1, max_wait=0)
+    with pytest.raises(RuntimeError):
+        batcher.submit('a').result(timeout=5)
+
+    assert batcher.submit('b').result(timeout=5) == 'b'
+
+def test_short_result_fails_the_batch(make_batcher):
+    """Too few results fail every future rather than leaving some unresolved."""
+    batcher = make_batcher(lambda items: items[:-1], max_batch_size=4, max_wait=0.1)
+    futures = [batcher.submit(i) for i in range(3)]
+
+    for future in futures:
+        with pytest.raises(ValueError):
+            future.result(timeout=5)
+
+def test_close_drains_queue_and_rejects_new_items(make_batcher):
+    """close() processes what is already queued, stops the worker and refuses later items."""
+    batcher = make_batcher(RecordingBatch(), max_batch_size=2, max_wait=0.01)
+    futures = [batcher.submit(i) for i in range(5)]
+    batcher.close()
+
+    assert [future.result(timeout=5) for future in futures] == [0, 2, 4, 6, 8]
+    assert not batcher._worker.is_alive()
+    with pytest.raises(RuntimeError):
+        batcher.submit(5)
+
+@pytest.mark.skipif(not hasattr(os, 'fork'), reason="requires os.fork")
+def test_worker_restarted_after_fork(make_batcher):
+    """A forked child gets its own worker thread and can still submit items."""
+    batcher = make_batcher(RecordingBatch(), max_batch_size=4, max_wait=0.01)
+    assert batcher.submit(1).result(timeout=5) == 2
+
+    pid = os.fork()
+    if pid == 0:
+        try:
+            ok = batcher.submit(3).result(timeout=5) == 6
+        except BaseException:
+            ok = False
+        os._exit(0 if ok else 1)
+
+    _, status = os.waitpid(pid, 0)
+    assert os.waitstatus_to_exitcode(status) == 0
+    assert batcher.submit(5).result(timeout=5) == 10
@@ -0,0 +1,73 @@
+"""
+Tests for the response caches of SimpleChatbot and ORBAI.
+"""
+import pytest
+
+from simple_chatbot import SimpleChatbot
+
+@pytest.fixture
+def simple_chatbot():
+    """A chatbot with an empty answer cache."""
+    return SimpleChatbot()
+
+def test_simple_answer_cache_hit_is_equal(simple_chatbot):
+    """A repeated question is answered from the cache with the same response."""
+    first = simple_chatbot.answer_query("Where is Tech Park?")
+    second = simple_chatbot.answer_query("Where is Tech Park?")
+
+    assert first == second
+    assert simple_chatbot._format_answer_cached.cache_info().hits >= 1
+
+def test_simple_answer_cache_returns_copies(simple_chatbot):
+    """Changing one answer does not leak into the next answer from the cache."""
+    first = simple_chatbot.answer_query("Where is Tech Park?")
+    first['response'] = 'changed'
+
+    assert simple_chatbot.answer_query("Where is Tech Park?")['response'] != 'changed'
+
+def test_simple_low_confidence_answers_bypass_cache(simple_chatbot):
+    """Questions without a confident match get suggestions, not a cached answer."""
+    simple_chatbot.answer_query("What is the meaning of life?")
+
+    assert simple_chatbot._format_answer_cached.cache_info().currsize == 0
+
+@pytest.fixture
+def orb():
+    """A fresh ORB AI conversation; orb_ai loads spaCy and Flask, so it is imported only here."""
+    from orb_ai import ORBAI
+    return ORBAI()
+
+def test_orb_query_cache_replays_response(orb):
+    """A repeated context-free query is answered from the cache with an equal, separate response."""
+    first = orb.process_query("Where is Tech Park?")
+    assert len(orb._query_cache) == 1
+
+    second = orb.process_query("Where is Tech Park?")
+    assert second == first
+    assert second is not first
+    assert orb.context['conversation_history'][-1]['response'] is second
+
+def test_orb_query_cache_restores_context(orb):
+    """A replayed query leaves the conversation context as processing it would."""
+    orb.process_query("Where is Tech Park?")
+    expected_entities = list(orb.context['last_entities'])
+    orb.process_query("Tell me about Kattankulathur")
+
+    orb.process_query("Where is Tech Park?")
+    assert orb.context['last_entities'] == expected_entities
+
+def test_orb_follow_ups_are_not_cached(orb):
+    """Questions that lean on the conversation context are always processed again."""
+    orb.process_query("Where is Tech Park?")
+    cached = len(orb._query_cache)
+
+    orb.process_query("Where is it?")
+    assert len(orb._query_cache) == cached
+
+def test_orb_query_cache_invalidated_by_graph_changes(orb):
+    """Changing the knowledge graph stops old answers from being replayed."""
+    orb.process_query("Where is Tech Park?")
+    orb.knowledge_graph.add_entity('Tech Park', 'location', {'description': 'Rebuilt research block'})
+
+    response = orb.process_query("Where is Tech Park?")
+    assert 'Rebuilt research block' in response['formatted_answer']
@@ -1,7 +1,13 @@
+from collections import OrderedDict
+from copy import deepcopy
 from enum import Enum
+from functools import lru_cache
 from typing import Dict, Any, Optional, List, Tuple
 import re
+import threading
+import numpy as np
 import spacy
+from spacy.symbols import ADJ, NOUN, PRON
 
 class QuestionType(Enum):
     GREETING = "greeting"
@@ -11,10 +17,115 @@ class QuestionType(Enum):
     COMPARATIVE = "comparative"
     UNKNOWN = "unknown"
 
+# Example questions for each type, compared against queries no pattern classifies
+QUESTION_TYPE_EXAMPLES = {
+    QuestionType.LOCATION: ["Where is the library", "How do I get to the campus"],
+    QuestionType.FACTUAL: ["What are the courses offered", "Tell me about the programs"],
+    QuestionType.PROCEDURAL: ["How do I apply for admission", "What are the steps to register"],
+    QuestionType.COMPARATIVE: ["Compare the campuses", "Which program is better"]
+}
+
+# Words and labels _extract_context looks for
+TIME_WORDS = ('today', 'tomorrow', 'yesterday')
+LOCATION_LABELS = ('GPE', 'LOC')
+REQUIREMENT_WORDS = ('need', 'require', 'must', 'should')
+
+# Closed vocabularies behind the campus and facility patterns: every match of a type's patterns contains one
+# of its words, so a lowercased query lacking them all skips that type's sweeps
+ENTITY_TYPE_KEYWORDS = {
+    'campus': ('kattankulathur', 'chennai', 'delhi-ncr', 'modinagar', 'ramapuram', 'vadapalani', 'amaravati', 'sikkim'),
+    'facility': (
+        'park', 'library', 'hostel', 'cafeteria', 'sports', 'gymnasium', 'lab', 'auditorium', 'building', 'block'
+    )
+}
+
+# Every greeting pattern starts with one of these words, so other queries skip the greeting regex
+GREETING_PREFIXES = ('hi', 'hello', 'hey', 'greetings', 'good', 'how', "what's")
+
+# Queries handed to nlp.pipe at a time by classify_batch
+PARSE_BATCH_SIZE = 64
+# Number of lowercased queries whose classification is remembered
+CLASSIFICATION_CACHE_SIZE = 4096
+
+@lru_cache(maxsize=None)
+def _load_nlp(model: str, disable: Tuple[str, ...] = ()):
+    """Load a spaCy pipeline once per process, shared by every TextProcessor that asks for it."""
+    return spacy.load(model, disable=list(disable))
+
+def _format_list_field(key: str, value: list) -> str:
+    """Format a list field as a comma-separated line."""
+    return f"{key.title()}: {', '.join(str(v) for v in value)}"
+
+def _format_dict_field(key: str, value: dict) -> str:
+    """Format a dict field as a bulleted list of its entries other than 'id'."""
+    details = [f"{k}: {v}" for k, v in value.items() if k != 'id']
+    return f"{key.title()}:\n- " + "\n- ".join(details)
+
+def _format_scalar_field(key: str, value: Any) -> str:
+    """Format any other field on one line."""
+    return f"{key.title()}: {value}"
+
+# Field value type -> formatter, so the common types dispatch with one lookup
+_FIELD_FORMATTERS = {
+    list: _format_list_field,
+    dict: _format_dict_field,
+    str: _format_scalar_field,
+    int: _format_scalar_field,
+    float: _format_scalar_field,
+    bool: _format_scalar_field,
+    type(None): _format_scalar_field
+}
+
+def _format_field(key: str, value: Any) -> str:
+    """Format one field of a factual answer by the type of its value."""
+    formatter = _FIELD_FORMATTERS.get(type(value))
+    if formatter is None:
+        # Subclasses and other types keep the isinstance rules
+        if isinstance(value, list):
+            formatter = _format_list_field
+        elif isinstance(value, dict):
+            formatter = _format_dict_field
+        else:
+            formatter = _format_scalar_field
+    return formatter(key, value)
+
 class TextProcessor:
-    def __init__(self):
-        """Initialize the text processor with NLP model and patterns."""
-        self.nlp = spacy.load('en_core_web_sm')
+    def __init__(self, model: str = 'en_core_web_sm'):
+        """
+        Initialize the text processor with NLP model and patterns.
+        
+        Semantic question classification needs a model with word vectors, such as en_core_web_md; with the
+        default en_core_web_sm, which has none, questions no pattern classifies stay UNKNOWN.
+        """
+        # Lemmas are never read; the attribute ruler stays because it maps the tagger's tags to token.pos_
+        self.nlp = _load_nlp(model, ('lemmatizer',))
+        
+        # Without word vectors a doc's vector is an average of context features, too poor to classify by
+        self._has_vectors = self.nlp.vocab.vectors.size > 0
+        
+        # The example questions never change, so they are parsed once here and their unit vectors stacked
+        # into one matrix, with a parallel list of their types, to be scored against a query in a single product
+        self._example_types = []
+        self._example_unit_vectors = None
+        if self._has_vectors:
+            example_docs = []
+            for qtype, examples in QUESTION_TYPE_EXAMPLES.items():
+                for example in examples:
+                    example_docs.append(self.nlp(example))
+                    self._example_types.append(qtype)
+            vectors = np.stack([example_doc.vector for example_doc in example_docs])
+            norms = np.array([[example_doc.vector_norm] for example_doc in example_docs], dtype=vectors.dtype)
+            # Like Doc.similarity, an example without a vector scores 0, so its row stays zero
+            self._example_unit_vectors = np.divide(vectors, norms, out=np.zeros_like(vectors), where=norms > 0)
+        
+        # String hashes of the words and labels _extract_context looks for, compared against the tokens'
+        # integer attributes so the scan never builds the string form of a token's tag, label or text
+        strings = self.nlp.vocab.strings
+        self._time_word_ids = frozenset(strings.add(word) for word in TIME_WORDS)
+        self._location_label_ids = frozenset(strings.add(label) for label in LOCATION_LABELS)
+        self._requirement_word_ids = frozenset(strings.add(word) for word in REQUIREMENT_WORDS)
+        self._attr_dep_id = strings.add('attr')
+        self._dobj_dep_id = strings.add('dobj')
         
         # Common variations of question patterns
         self.question_patterns = {
@@ -65,87 +176,166 @@ class TextProcessor:
             r'^(?:hi|hello|hey|greetings|good\s*(?:morning|afternoon|evening))(?:\s|$)',
             r'^(?:how\s*are\s*you|what\'s\s*up)(?:\s|$)'
         ]
+        
+        # Compiled once here instead of being looked up in re's cache on every call, and case-sensitively:
+        # queries are lowercased before matching and the patterns are all lowercase. The question types
+        # become one alternation matched at the start of the query: each type's branch looks ahead for any
+        # of its patterns anywhere in the query, and branches are tried in table order, so one call finds
+        # the type that searching every pattern in turn would; the winning branch's group is its type's name
+        self._question_type_re = re.compile(r'\A(?:' + '|'.join(
+            rf'(?=(?s:.*?)(?:{"|".join(patterns)}))(?P<{qtype.name}>)'
+            for qtype, patterns in self.question_patterns.items()
+        ) + ')')
+        # Entity patterns stay separate: each one contributes its own, possibly overlapping, matches. None
+        # matches an empty string, so one search for any of them tells whether a query names an entity at all
+        self._entity_res = {
+            entity_type: [re.compile(pattern) for pattern in patterns]
+            for entity_type, patterns in self.entity_patterns.items()
+        }
+        self._any_entity_re = re.compile('|'.join(
+            f'(?:{pattern})' for patterns in self.entity_patterns.values() for pattern in patterns
+        ))
+        self._greeting_re = re.compile('|'.join(f'(?:{pattern})' for pattern in self.greeting_patterns))
+        
+        # Classification depends only on the lowercased query, so recent ones are reused
+        self._classification_cache: 'OrderedDict[str, Dict[str, Any]]' = OrderedDict()
+        self._classification_cache_lock = threading.Lock()
 
     def classify_question(self, query: str) -> Dict[str, Any]:
         """
         Classify the question type and extract relevant entities using both
         pattern matching and semantic similarity.
+        
+        spaCy only runs when the patterns leave the entities unknown, or the type unknown and the model has
+        vectors to classify it by, or for comparative questions, whose comparison aspects come from the
+        parse; otherwise the context is empty.
         """
         query = query.lower().strip()
+        result = self._cached_classification(query)
+        if result is None:
+            result, needs_parse = self._classify_by_patterns(query)
+            if needs_parse:
+                self._apply_parse(result, self.nlp(query))
+            self._cache_classification(query, result)
+        # A copy, so callers can't alter the remembered classification
+        return deepcopy(result)
+
+    def classify_batch(self, queries: List[str]) -> List[Dict[str, Any]]:
+        """Classify several questions like classify_question, parsing the ones that need spaCy in one pipe."""
+        queries = [query.lower().strip() for query in queries]
+        cached = [self._cached_classification(query) for query in queries]
+        
+        # Each distinct uncached query is classified once, and only those needing spaCy are parsed
+        classified = {}
+        for query, result in zip(queries, cached):
+            if result is None and query not in classified:
+                classified[query] = self._classify_by_patterns(query)
+        pending = [query for query, (_, needs_parse) in classified.items() if needs_parse]
+        for query, doc in zip(pending, self.nlp.pipe(pending, batch_size=PARSE_BATCH_SIZE)):
+            self._apply_parse(classified[query][0], doc)
+        for query, (result, _) in classified.items():
+            self._cache_classification(query, result)
         
+        return [
+            deepcopy(result if result is not None else classified[query][0])
+            for query, result in zip(queries, cached)
+        ]
+
+    def _cached_classification(self, query: str) -> Optional[Dict[str, Any]]:
+        """Return the remembered classification of a lowercased query, or None."""
+        with self._classification_cache_lock:
+            result = self._classification_cache.get(query)
+            if result is not None:
+                self._classification_cache.move_to_end(query)
+            return result
+
+    def _cache_classification(self, query: str, result: Dict[str, Any]) -> None:
+        """Remember a lowercased query's classification, evicting the least recently used one."""
+        with self._classification_cache_lock:
+            self._classification_cache[query] = result
+            if len(self._classification_cache) > CLASSIFICATION_CACHE_SIZE:
+                self._classification_cache.popitem(last=False)
+
+    def _classify_by_patterns(self, query: str) -> Tuple[Dict[str, Any], bool]:
+        """Classify a lowercased query by its patterns alone, and say whether it still needs a spaCy parse."""
         # Check for greetings first
-        if any(re.match(pattern, query) for pattern in self.greeting_patterns):
+        if query.startswith(GREETING_PREFIXES) and self._greeting_re.match(query):
             return {
                 'type': QuestionType.GREETING,
                 'entities': [],
+                'entity_types': {},
                 'context': {}
-            }
-        
-        # Process with spaCy for semantic understanding
-        doc = self.nlp(query)
+            }, False
         
         # Try pattern matching first
         question_type = self._match_question_type(query)
-        entities = self._extract_entities(query)
+        entities, entity_types = self._extract_entities(query)
+        result = {
+            'type': question_type,
+            'entities': entities,
+            'entity_types': entity_types,
+            'context': {}
+        }
         
+        # Patterns alone answer the question unless they missed the entities, or the type and the model can
+        # classify it semantically; comparative questions also need the parse for their comparison aspects
+        needs_parse = (
+            not entities
+            or question_type == QuestionType.COMPARATIVE
+            or (question_type == QuestionType.UNKNOWN and self._has_vectors)
+        )
+        return result, needs_parse
+
+    def _apply_parse(self, result: Dict[str, Any], doc) -> None:
+        """Complete a pattern classification from the query's spaCy parse."""
         # If pattern matching fails, use semantic similarity
-        if question_type == QuestionType.UNKNOWN:
-            question_type = self._semantic_question_classification(doc)
+        if result['type'] == QuestionType.UNKNOWN:
+            result['type'] = self._semantic_question_classification(doc)
         
         # Extract additional context
-        context = self._extract_context(doc)
+        result['context'] = self._extract_context(doc)
         
         # If still no entities found, try semantic entity extraction
-        if not entities:
-            entities.extend(self._semantic_entity_extraction(doc))
-        
-        return {
-            'type': question_type,
-            'entities': entities,
-            'context': context
-        }
+        if not result['entities']:
+            result['entities'].extend(self._semantic_entity_extraction(doc))
 
     def _match_question_type(self, query: str) -> QuestionType:
         """Match question type using regex patterns."""
-        for qtype, patterns in self.question_patterns.items():
-            for pattern in patterns:
-                if re.search(pattern, query, re.IGNORECASE):
-                    return qtype
+        match = self._question_type_re.match(query)
+        if match:
+            return QuestionType[match.lastgroup]
         return QuestionType.UNKNOWN
 
-    def _extract_entities(self, query: str) -> List[str]:
-        """Extract entities using regex patterns."""
-        entities = []
-        for entity_type, patterns in self.entity_patterns.items():
+    def _extract_entities(self, query: str) -> Tuple[List[str], Dict[str, str]]:
+        """Extract entities using regex patterns, in order found, along with the type of the first pattern each matched."""
+        # Most queries name no entity, and then a single search replaces every per-pattern sweep
+        if not self._any_entity_re.search(query):
+            return [], {}
+        
+        # Keyed by entity in the order first found, so its keys are also the deduplicated entities
+        entity_types = {}
+        for entity_type, patterns in self._entity_res.items():
+            keywords = ENTITY_TYPE_KEYWORDS.get(entity_type)
+            if keywords and not any(keyword in query for keyword in keywords):
+                continue
             for pattern in patterns:
-                matches = re.finditer(pattern, query, re.IGNORECASE)
-                for match in matches:
+                for match in pattern.finditer(query):
                     if match.groups():
-                        entities.append(match.group(1).strip())
-        return list(set(entities))
+                        entity_types.setdefault(match.group(1).strip(), entity_type)
+        return list(entity_types), entity_types
 
     def _semantic_question_classification(self, doc) -> QuestionType:
         """Classify question type using semantic similarity."""
-        # Example questions for each type
-        type_examples = {
-            QuestionType.LOCATION: ["Where is the library", "How do I get to the campus"],
-            QuestionType.FACTUAL: ["What are the courses offered", "Tell me about the programs"],
-            QuestionType.PROCEDURAL: ["How do I apply for admission", "What are the steps to register"],
-            QuestionType.COMPARATIVE: ["Compare the campuses", "Which program is better"]
-        }
-        
-        best_similarity = 0
-        best_type = QuestionType.UNKNOWN
-        
-        for qtype, examples in type_examples.items():
-            for example in examples:
-                example_doc = self.nlp(example)
-                similarity = doc.similarity(example_doc)
-                if similarity > best_similarity:
-                    best_similarity = similarity
-                    best_type = qtype
+        if not self._has_vectors:
+            return QuestionType.UNKNOWN
         
-        return best_type
+        # Cosine similarity to every example at once, left unscaled by the query's norm: a positive factor
+        # changes neither the ranking nor the sign. argmax keeps the first example among ties
+        similarities = self._example_unit_vectors @ doc.vector
+        best = int(similarities.argmax())
+        if similarities[best] > 0:
+            return self._example_types[best]
+        return QuestionType.UNKNOWN
 
     def _semantic_entity_extraction(self, doc) -> List[str]:
         """Extract entities using spaCy's NER and noun chunks."""
@@ -158,11 +348,11 @@ class TextProcessor:
         
         # Extract noun chunks as potential entities
         for chunk in doc.noun_chunks:
-            # Filter out common words and pronouns
-            if not any(token.is_stop or token.pos_ == 'PRON' for token in chunk):
+            # Filter out common words and pronouns; the integer POS spares building each token's tag string
+            if not any(token.is_stop or token.pos == PRON for token in chunk):
                 entities.append(chunk.text)
         
-        return list(set(entities))
+        return list(dict.fromkeys(entities))
 
     def _extract_context(self, doc) -> Dict[str, Any]:
         """Extract additional context from the query."""
@@ -174,22 +364,24 @@ class TextProcessor:
         }
         
         for token in doc:
+            orth = token.orth
+            
             # Extract time references
-            if token.pos_ == 'NOUN' and token.text in ['today', 'tomorrow', 'yesterday']:
+            if orth in self._time_word_ids and token.pos == NOUN:
                 context['time_reference'] = token.text
             
             # Extract location references
-            if token.ent_type_ in ['GPE', 'LOC']:
+            if token.ent_type in self._location_label_ids:
                 context['location_reference'] = token.text
             
             # Extract comparison aspects
-            if token.dep_ == 'attr' and token.head.pos_ == 'ADJ':
+            if token.dep == self._attr_dep_id and token.head.pos == ADJ:
                 context['comparison_aspects'].append(token.text)
             
             # Extract requirements
-            if token.text in ['need', 'require', 'must', 'should']:
+            if orth in self._requirement_word_ids:
                 for child in token.children:
-                    if child.dep_ == 'dobj':
+                    if child.dep == self._dobj_dep_id:
                         context['requirements'].append(child.text)
         
         return context
@@ -211,10 +403,7 @@ class TextProcessor:
                 return "I'm sorry, I couldn't find information about that location."
             
             # Remove duplicates by using a dictionary with entity IDs as keys
-            unique_items = {}
-            for item in data:
-                if 'id' in item:
-                    unique_items[item['id']] = item
+            unique_items = {item['id']: item for item in data if 'id' in item}
             
             response = []
             for item in unique_items.values():
@@ -223,17 +412,16 @@ class TextProcessor:
                 if 'description' in item:
                     response.append(f"Description: {item['description']}")
                 if 'facilities' in item:
-                    if isinstance(item['facilities'], list):
+                    facilities = item['facilities']
+                    if isinstance(facilities, list):
                         # Handle both string and dictionary facilities
-                        facility_names = []
-                        for facility in item['facilities']:
-                            if isinstance(facility, dict):
-                                facility_names.append(facility.get('name', facility.get('id', '')))
-                            else:
-                                facility_names.append(str(facility))
+                        facility_names = [
+                            facility.get('name', facility.get('id', '')) if isinstance(facility, dict) else str(facility)
+                            for facility in facilities
+                        ]
                         response.append(f"Facilities: {', '.join(facility_names)}")
                     else:
-                        response.append(f"Facilities: {item['facilities']}")
+                        response.append(f"Facilities: {facilities}")
                 if 'map_link' in item:
                     response.append(f"Map: {item['map_link']}")
             
@@ -243,17 +431,7 @@ class TextProcessor:
             if not data:
                 return "I'm sorry, I don't have that information. Could you please rephrase your question?"
             
-            response = []
-            for key, value in data.items():
-                if isinstance(value, list):
-                    response.append(f"{key.title()}: {', '.join(str(v) for v in value)}")
-                elif isinstance(value, dict):
-                    details = [f"{k}: {v}" for k, v in value.items() if k != 'id']
-                    response.append(f"{key.title()}:\n- " + "\n- ".join(details))
-                else:
-                    response.append(f"{key.title()}: {value}")
-            
-            return "\n\n".join(response)
+            return "\n\n".join(_format_field(key, value) for key, value in data.items())
         
         if question_type == QuestionType.PROCEDURAL:
             if not data.get('steps'):
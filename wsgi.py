@@ -0,0 +1,12 @@
+"""
+WSGI entry point for serving the chatbot API with a production server.
+
+    gunicorn -k gthread -w 4 --threads 8 --preload -b 0.0.0.0:5000 wsgi:application
+
+The chatbot, its NLU model and knowledge base indexes are built when app is
+imported, so with --preload they are loaded once in the master process and
+shared copy-on-write by the forked workers.
+"""
+from app import app
+
+application = app